@@ -3,29 +3,195 @@
 """
 
 import os
+import io
 import time
-import glob
 import sys
 import json
+import asyncio
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
 # Добавляем текущую директорию в путь для импорта
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from graphextractor.detector import GraphDetector
-from graphextractor.graph_builder import NetworkXBuilder
-from graphextractor.preprocessing import QualityAnalyzer, ImageEnhancer
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
-def run_batch_test(images_dir="test_images", results_dir="test_results"):
+try:
+    import aiofiles
+    AIOFILES_AVAILABLE = True
+except ImportError:
+    AIOFILES_AVAILABLE = False
+
+# Расширения файлов тестовых изображений
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+
+# Детекторы и построитель графов процесса-обработчика, создаются один раз в _init_worker
+_detectors = {}
+_builder = None
+
+def _init_worker():
+    """Инициализирует процесс-обработчик: один раз создает детекторы для всех вариантов теста."""
+    # Загрузка моделей EasyOCR/torch занимает секунды, поэтому детекторы
+    # переиспользуются для всех изображений, обрабатываемых этим процессом
+    # Тяжелые модули (torch, EasyOCR, OpenCV) импортируются только в процессах-обработчиках
+    from graphextractor.detector import GraphDetector
+    from graphextractor.graph_builder import NetworkXBuilder
+    
+    global _builder
+    _builder = NetworkXBuilder()
+    _detectors["base"] = GraphDetector(config={
+        "ocr_enabled": False,
+        "enhancer": {"enabled": False},
+        "caching_enabled": False
+    })
+    _detectors["enhanced"] = GraphDetector(config={
+        "ocr_enabled": True,
+        "enhancer": {"enabled": True},
+        "caching_enabled": False
+    })
+    _detectors["cached"] = GraphDetector(config={
+        "ocr_enabled": True,
+        "enhancer": {"enabled": True},
+        "caching_enabled": True
+    })
+
+async def _write_file(path, data):
+    """Асинхронно записывает байты в файл."""
+    if AIOFILES_AVAILABLE:
+        async with aiofiles.open(path, "wb") as f:
+            await f.write(data)
+    else:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, Path(path).write_bytes, data)
+
+def _dumps_json(data):
+    """Сериализует данные в JSON с отступами (через orjson, если он установлен)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, indent=2).encode("utf-8")
+
+def _render_graph(builder, graph):
+    """Сериализует граф в GEXF и PNG в памяти, возвращает пару байтовых строк."""
+    gexf_buffer = io.BytesIO()
+    builder.save_graph(graph, gexf_buffer)
+    png_buffer = io.BytesIO()
+    builder.visualize_graph(graph, png_buffer, reuse_figure=True)
+    return gexf_buffer.getvalue(), png_buffer.getvalue()
+
+def _process_one(image_path, results_dir):
+    """
+    Тестирует одно изображение.
+
+    Возвращает словарь с результатами и словарь {путь: байты} с файлами,
+    которые нужно записать на диск.
+    """
+    image_name = os.path.basename(image_path)
+    print(f"\nТестирование {image_name}...")
+
+    # Создаем поддиректорию для результатов этого изображения
+    image_result_dir = os.path.join(results_dir, Path(image_name).stem)
+    os.makedirs(image_result_dir, exist_ok=True)
+
+    try:
+        # 1. Тестирование без улучшения и OCR
+        print(f"  [{image_name}] Базовое распознавание без улучшений...")
+        start_time = time.perf_counter_ns()
+        result_base = _detectors["base"].detect(image_path)
+        base_time = (time.perf_counter_ns() - start_time) / 1e9
+
+        # Сериализуем базовый результат (запись на диск выполняет основной процесс)
+        builder = _builder
+        graph_base = builder.build_graph(result_base)
+        base_graph_path = os.path.join(image_result_dir, "base_graph.gexf")
+        base_viz_path = os.path.join(image_result_dir, "base_visualization.png")
+        base_gexf, base_png = _render_graph(builder, graph_base)
+
+        # 2. Тестирование с улучшением и OCR
+        print(f"  [{image_name}] Расширенное распознавание с улучшениями и OCR...")
+        start_time = time.perf_counter_ns()
+        result_enhanced = _detectors["enhanced"].detect(image_path)
+        enhanced_time = (time.perf_counter_ns() - start_time) / 1e9
+
+        # Сериализуем улучшенный результат
+        graph_enhanced = builder.build_graph(result_enhanced)
+        enhanced_graph_path = os.path.join(image_result_dir, "enhanced_graph.gexf")
+        enhanced_viz_path = os.path.join(image_result_dir, "enhanced_visualization.png")
+        enhanced_gexf, enhanced_png = _render_graph(builder, graph_enhanced)
+
+        # 3. Тест кэширования
+        print(f"  [{image_name}] Тестирование кэширования...")
+        detector_cached = _detectors["cached"]
+
+        # Первый запуск (должен создать кэш)
+        start_time = time.perf_counter_ns()
+        detector_cached.detect(image_path)
+        first_cached_time = (time.perf_counter_ns() - start_time) / 1e9
+
+        # Второй запуск (должен использовать кэш)
+        start_time = time.perf_counter_ns()
+        detector_cached.detect(image_path)
+        second_cached_time = (time.perf_counter_ns() - start_time) / 1e9
+
+        # Запись результатов для этого изображения
+        image_result = {
+            "image_name": image_name,
+            "base_nodes": len(result_base["nodes"]),
+            "base_edges": len(result_base["edges"]),
+            "base_time": base_time,
+            "enhanced_nodes": len(result_enhanced["nodes"]),
+            "enhanced_edges": len(result_enhanced["edges"]),
+            "enhanced_time": enhanced_time,
+            "cache_first_time": first_cached_time,
+            "cache_second_time": second_cached_time,
+            "cache_speedup": first_cached_time / max(second_cached_time, 1e-9),
+            "quality_level": result_enhanced.get("quality_info", {}).get("quality_level", "N/A"),
+            "ocr_texts": len(result_enhanced.get("text_regions", [])),
+            "base_graph_path": base_graph_path,
+            "base_viz_path": base_viz_path,
+            "enhanced_graph_path": enhanced_graph_path,
+            "enhanced_viz_path": enhanced_viz_path
+        }
+
+        print(f"  [{image_name}] Базовое распознавание: {len(result_base['nodes'])} узлов, "
+             f"{len(result_base['edges'])} ребер за {base_time:.2f} сек")
+        print(f"  [{image_name}] Улучшенное распознавание: {len(result_enhanced['nodes'])} узлов, "
+             f"{len(result_enhanced['edges'])} ребер за {enhanced_time:.2f} сек")
+        print(f"  [{image_name}] Ускорение кэширования: {image_result['cache_speedup']:.1f}x "
+             f"({first_cached_time:.2f} сек -> {second_cached_time:.2f} сек)")
+
+        artifacts = {
+            base_graph_path: base_gexf,
+            base_viz_path: base_png,
+            enhanced_graph_path: enhanced_gexf,
+            enhanced_viz_path: enhanced_png
+        }
+        return image_result, artifacts
+
+    except Exception as e:
+        print(f"  Ошибка при обработке {image_name}: {str(e)}")
+        return {
+            "image_name": image_name,
+            "error": str(e)
+        }, {}
+
+async def run_batch_test(images_dir="test_images", results_dir="test_results"):
     """Выполняет тестирование GraphExtractor на всех изображениях в указанной директории."""
     
     # Создаем директорию для результатов
     os.makedirs(results_dir, exist_ok=True)
     
-    # Получаем список всех изображений
-    image_files = glob.glob(os.path.join(images_dir, "*.png")) + \
-                 glob.glob(os.path.join(images_dir, "*.jpg")) + \
-                 glob.glob(os.path.join(images_dir, "*.jpeg"))
+    # Получаем список всех изображений за один проход по директории
+    image_files = []
+    if os.path.isdir(images_dir):
+        with os.scandir(images_dir) as entries:
+            image_files = [
+                entry.path for entry in entries
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+            ]
     
     if not image_files:
         print(f"Ошибка: Изображения не найдены в директории {images_dir}")
@@ -33,12 +199,6 @@ def run_batch_test(images_dir="test_images", results_dir="test_results"):
     
     print(f"Найдено {len(image_files)} тестовых изображений")
     
-    # Анализатор качества
-    quality_analyzer = QualityAnalyzer()
-    
-    # Улучшитель изображений
-    enhancer = ImageEnhancer()
-    
     # Общие результаты теста
     test_results = {
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
@@ -46,122 +206,40 @@ def run_batch_test(images_dir="test_images", results_dir="test_results"):
         "results": []
     }
     
-    # Тестируем каждое изображение
-    for i, image_path in enumerate(image_files):
-        image_name = os.path.basename(image_path)
-        print(f"\n[{i+1}/{len(image_files)}] Тестирование {image_name}...")
-        
-        # Создаем поддиректорию для результатов этого изображения
-        image_result_dir = os.path.join(results_dir, Path(image_name).stem)
-        os.makedirs(image_result_dir, exist_ok=True)
-        
-        try:
-            # 1. Тестирование без улучшения и OCR
-            print("  Базовое распознавание без улучшений...")
-            start_time = time.time()
-            detector_base = GraphDetector(config={
-                "ocr_enabled": False,
-                "enhancer": {"enabled": False},
-                "caching_enabled": False
-            })
-            result_base = detector_base.detect(image_path)
-            base_time = time.time() - start_time
-            
-            # Сохраняем базовый результат
-            builder = NetworkXBuilder()
-            graph_base = builder.build_graph(result_base)
-            base_graph_path = os.path.join(image_result_dir, "base_graph.gexf")
-            builder.save_graph(graph_base, base_graph_path)
-            base_viz_path = os.path.join(image_result_dir, "base_visualization.png")
-            builder.visualize_graph(graph_base, base_viz_path)
-            
-            # 2. Тестирование с улучшением и OCR
-            print("  Расширенное распознавание с улучшениями и OCR...")
-            start_time = time.time()
-            detector_enhanced = GraphDetector(config={
-                "ocr_enabled": True,
-                "enhancer": {"enabled": True},
-                "caching_enabled": False
-            })
-            result_enhanced = detector_enhanced.detect(image_path)
-            enhanced_time = time.time() - start_time
-            
-            # Сохраняем улучшенный результат
-            graph_enhanced = builder.build_graph(result_enhanced)
-            enhanced_graph_path = os.path.join(image_result_dir, "enhanced_graph.gexf")
-            builder.save_graph(graph_enhanced, enhanced_graph_path)
-            enhanced_viz_path = os.path.join(image_result_dir, "enhanced_visualization.png")
-            builder.visualize_graph(graph_enhanced, enhanced_viz_path)
-            
-            # 3. Тест кэширования
-            print("  Тестирование кэширования...")
-            detector_cached = GraphDetector(config={
-                "ocr_enabled": True,
-                "enhancer": {"enabled": True},
-                "caching_enabled": True
-            })
-            
-            # Первый запуск (должен создать кэш)
-            start_time = time.time()
-            detector_cached.detect(image_path)
-            first_cached_time = time.time() - start_time
-            
-            # Второй запуск (должен использовать кэш)
-            start_time = time.time()
-            detector_cached.detect(image_path)
-            second_cached_time = time.time() - start_time
-            
-            # Запись результатов для этого изображения
-            image_result = {
-                "image_name": image_name,
-                "base_nodes": len(result_base["nodes"]),
-                "base_edges": len(result_base["edges"]),
-                "base_time": base_time,
-                "enhanced_nodes": len(result_enhanced["nodes"]),
-                "enhanced_edges": len(result_enhanced["edges"]),
-                "enhanced_time": enhanced_time,
-                "cache_first_time": first_cached_time,
-                "cache_second_time": second_cached_time,
-                "cache_speedup": first_cached_time / max(second_cached_time, 0.001),
-                "quality_level": result_enhanced.get("quality_info", {}).get("quality_level", "N/A"),
-                "ocr_texts": len(result_enhanced.get("text_regions", [])),
-                "base_graph_path": base_graph_path,
-                "base_viz_path": base_viz_path,
-                "enhanced_graph_path": enhanced_graph_path,
-                "enhanced_viz_path": enhanced_viz_path
-            }
-            
+    # Тестируем изображения параллельно: каждое обрабатывается в отдельном процессе,
+    # результаты собираются по мере готовности
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=os.cpu_count(),
+                             initializer=_init_worker) as executor:
+        futures = [loop.run_in_executor(executor, _process_one, image_path, results_dir)
+                   for image_path in image_files]
+        for i, future in enumerate(asyncio.as_completed(futures)):
+            image_result, artifacts = await future
+            # Записываем файлы графов и визуализаций одновременно
+            await asyncio.gather(*(_write_file(path, data) for path, data in artifacts.items()))
             test_results["results"].append(image_result)
-            
-            print(f"  Базовое распознавание: {len(result_base['nodes'])} узлов, " 
-                 f"{len(result_base['edges'])} ребер за {base_time:.2f} сек")
-            print(f"  Улучшенное распознавание: {len(result_enhanced['nodes'])} узлов, "
-                 f"{len(result_enhanced['edges'])} ребер за {enhanced_time:.2f} сек")
-            print(f"  Ускорение кэширования: {image_result['cache_speedup']:.1f}x "
-                 f"({first_cached_time:.2f} сек -> {second_cached_time:.2f} сек)")
-            
-        except Exception as e:
-            print(f"  Ошибка при обработке {image_name}: {str(e)}")
-            test_results["results"].append({
-                "image_name": image_name,
-                "error": str(e)
-            })
+            print(f"[{i+1}/{len(image_files)}] Обработано {image_result['image_name']}")
     
     # Сохраняем общие результаты
     summary_path = os.path.join(results_dir, "test_summary.json")
-    with open(summary_path, "w") as f:
-        json.dump(test_results, f, indent=2)
+    await _write_file(summary_path, _dumps_json(test_results))
+    
+    # Считаем ошибки за один проход по результатам
+    failed = 0
+    for r in test_results["results"]:
+        if "error" in r:
+            failed += 1
     
     # Выводим сводку
     print("\n" + "="*50)
     print("РЕЗУЛЬТАТЫ ТЕСТИРОВАНИЯ")
     print("="*50)
     print(f"Обработано изображений: {len(image_files)}")
-    print(f"Успешно: {len([r for r in test_results['results'] if 'error' not in r])}")
-    print(f"С ошибками: {len([r for r in test_results['results'] if 'error' in r])}")
+    print(f"Успешно: {len(test_results['results']) - failed}")
+    print(f"С ошибками: {failed}")
     print(f"Сводка сохранена в: {summary_path}")
     
     return True
 
 if __name__ == "__main__":
-    run_batch_test()
+    asyncio.run(run_batch_test())
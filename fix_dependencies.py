@@ -6,7 +6,8 @@ import subprocess
 import sys
 import os
 import importlib
-import pkg_resources
+import ctypes.util
+from importlib.metadata import version, PackageNotFoundError
 
 def print_section(title):
     """Печатает заголовок раздела."""
@@ -27,15 +28,25 @@ def check_system_dependencies():
         "libXext.so"
     ]
     
+    # Получаем кэш динамического компоновщика один раз для всех библиотек
+    try:
+        ldconfig_out = subprocess.run(
+            ["ldconfig", "-p"], 
+            capture_output=True, 
+            text=True
+        ).stdout
+    except Exception:
+        ldconfig_out = None
+    
     for lib in libraries:
         try:
             # Проверяем наличие библиотеки
-            result = subprocess.run(
-                ["ldconfig", "-p"], 
-                capture_output=True, 
-                text=True
-            )
-            if lib in result.stdout:
+            if ldconfig_out is not None:
+                found = lib in ldconfig_out
+            else:
+                # ldconfig недоступен (например, macOS) - ищем через ctypes
+                found = ctypes.util.find_library(lib.split(".so")[0][len("lib"):]) is not None
+            if found:
                 print(f"✓ {lib} найдена")
             else:
                 print(f"✗ {lib} не найдена")
@@ -50,7 +61,7 @@ def check_package_versions():
     print("Проверка версий пакетов...")
     
     packages = [
-        "opencv-python",
+        "opencv-python-headless",
         "torch",
         "torchvision",
         "easyocr",
@@ -65,9 +76,9 @@ def check_package_versions():
     
     for package in packages:
         try:
-            version = pkg_resources.get_distribution(package).version
-            print(f"✓ {package}: версия {version}")
-        except pkg_resources.DistributionNotFound:
+            package_version = version(package)
+            print(f"✓ {package}: версия {package_version}")
+        except PackageNotFoundError:
             print(f"✗ {package}: не установлен")
         except Exception as e:
             print(f"? {package}: ошибка при проверке - {str(e)}")
@@ -82,13 +93,13 @@ def fix_torch_dependencies():
         torchvision_version = None
         
         try:
-            torch_version = pkg_resources.get_distribution("torch").version
+            torch_version = version("torch")
             print(f"Текущая версия torch: {torch_version}")
         except:
             print("Torch не установлен")
             
         try:
-            torchvision_version = pkg_resources.get_distribution("torchvision").version
+            torchvision_version = version("torchvision")
             print(f"Текущая версия torchvision: {torchvision_version}")
         except:
             print("Torchvision не установлен")
@@ -3,7 +3,11 @@
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend that doesn't require a display
 import matplotlib.pyplot as plt
-import networkx as nx
+from matplotlib.collections import LineCollection
+import numpy as np
+
+# Одна фигура на модуль, переиспользуется при повторных вызовах create_graph
+_FIG, _AX = plt.subplots(figsize=(10, 6))
 
 def create_graph():
     # Создаем вершины графа - те же, что и в оригинальном скрипте
@@ -19,13 +23,6 @@ def create_graph():
         ("Е", "К")
     ]
     
-    # Создаем граф
-    G = nx.Graph()
-    
-    # Добавляем вершины и рёбра
-    G.add_nodes_from(vertices)
-    G.add_edges_from(edges)
-    
     # Определяем расположение вершин - аналогично оригинальному скрипту
     pos = {
         "А": (-4, 0),
@@ -37,27 +34,32 @@ def create_graph():
         "К": (5, 0)
     }
     
-    # Настраиваем визуализацию
-    plt.figure(figsize=(10, 6))
+    # Очищаем оси от предыдущего рисунка
+    _AX.clear()
     
-    # Рисуем рёбра
-    nx.draw_networkx_edges(G, pos, width=2, edge_color='black')
+    # Граф маленький и фиксированный, поэтому рисуем его напрямую
+    # из списков координат, без построения объекта NetworkX
+    xs = np.array([pos[v][0] for v in vertices])
+    ys = np.array([pos[v][1] for v in vertices])
+    segments = np.array([[pos[a], pos[b]] for a, b in edges])
+    
+    # Рисуем рёбра одной коллекцией линий
+    _AX.add_collection(LineCollection(segments, colors='black', linewidths=2, zorder=1))
     
     # Рисуем вершины
-    nx.draw_networkx_nodes(G, pos, node_color='white', edgecolors='black', 
-                          node_size=700, linewidths=2)
+    _AX.scatter(xs, ys, s=700, facecolors='white', edgecolors='black', 
+                linewidths=2, zorder=2)
     
     # Добавляем метки к вершинам с немного увеличенным размером шрифта
-    nx.draw_networkx_labels(G, pos, font_size=16, font_family='sans-serif')
+    for v, x, y in zip(vertices, xs, ys):
+        _AX.text(x, y, v, fontsize=16, family='sans-serif', 
+                 ha='center', va='center', zorder=3)
     
     # Убираем оси
-    plt.axis('off')
-    
-    # Сохраняем изображение
-    plt.savefig('graph_output.png', dpi=300, bbox_inches='tight')
+    _AX.axis('off')
     
-    # Показываем граф
-    plt.show()
+    # Сохраняем изображение (бэкенд Agg не показывает окна, plt.show() не нужен)
+    _FIG.savefig('graph_output.png', dpi=300, bbox_inches='tight')
 
 if __name__ == "__main__":
     create_graph()
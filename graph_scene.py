@@ -24,25 +24,17 @@ class GraphFromImage(Scene):
         }
 
         # Configure vertex appearance (optional, adjust as needed)
-        vertex_config = {
-            "А": {"radius": 0.15, "color": WHITE},
-            "Б": {"radius": 0.15, "color": WHITE},
-            "В": {"radius": 0.15, "color": WHITE},
-            "Г": {"radius": 0.15, "color": WHITE},
-            "Д": {"radius": 0.15, "color": WHITE},
-            "Е": {"radius": 0.15, "color": WHITE},
-            "К": {"radius": 0.15, "color": WHITE},
-        }
+        vertex_style = {"radius": 0.15, "color": WHITE}
+        vertex_config = {v: dict(vertex_style) for v in vertices}
 
         # Configure label appearance and position
+        label_directions = {
+            "А": LEFT, "Б": UP, "В": DOWN, "Г": DOWN,
+            "Д": UP, "Е": UP, "К": RIGHT,
+        }
         label_config = {
-            "А": {"font_size": 36, "buff": 0.3, "direction": LEFT},
-            "Б": {"font_size": 36, "buff": 0.3, "direction": UP},
-            "В": {"font_size": 36, "buff": 0.3, "direction": DOWN},
-            "Г": {"font_size": 36, "buff": 0.3, "direction": DOWN},
-            "Д": {"font_size": 36, "buff": 0.3, "direction": UP},
-            "Е": {"font_size": 36, "buff": 0.3, "direction": UP},
-            "К": {"font_size": 36, "buff": 0.3, "direction": RIGHT},
+            v: {"font_size": 36, "buff": 0.3, "direction": label_directions[v]}
+            for v in vertices
         }
 
 
@@ -1,20 +1,35 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Query, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 import shutil
 import os
+import time
+import io
+import re
 import uuid
-import networkx as nx
-from tempfile import NamedTemporaryFile
+import json
+import hashlib
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from pathlib import Path
 import uvicorn
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Union
 
-from graphextractor.detector import GraphDetector
-from graphextractor.graph_builder import NetworkXBuilder
-from graphextractor.caching import CacheManager, ImageHashProvider
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from graphextractor.caching import CacheManager
+from graphextractor.api import worker
 
 app = FastAPI(title="Graph Extractor API", 
-             description="API for extracting graph structures from images")
+             description="API for extracting graph structures from images",
+             default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -25,14 +40,268 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+TEMP_DIR = Path("temp_uploads")
+OUTPUT_DIR = Path("output")
+
 # Create directories if they don't exist
-os.makedirs("temp_uploads", exist_ok=True)
-os.makedirs("output", exist_ok=True)
+TEMP_DIR.mkdir(exist_ok=True)
+OUTPUT_DIR.mkdir(exist_ok=True)
 os.makedirs("cache", exist_ok=True)
 
 # Initialize cache manager for API
 cache_manager = CacheManager(cache_dir="cache")
-hash_provider = ImageHashProvider()
+
+def safe_filename(filename: Optional[str]) -> str:
+    """
+    Reduce a client-supplied file name to a safe base name.
+    
+    Args:
+        filename: Original file name of the upload
+        
+    Returns:
+        File name without directories or unusual characters
+    """
+    name = re.sub(r"[^A-Za-z0-9._-]", "_", os.path.basename(filename or ""))
+    return name.lstrip(".") or "upload"
+
+# Read uploads in 1 MiB chunks instead of the 16 KiB shutil default
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+def _copy_upload(source, path: Union[str, Path]) -> str:
+    """Copy a file object to disk through one reused buffer, hashing it on the way."""
+    digest = hashlib.sha256()
+    with open(path, "wb") as buffer:
+        if not hasattr(source, "readinto"):
+            # SpooledTemporaryFile only gained readinto in Python 3.11
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                buffer.write(chunk)
+            return digest.hexdigest()
+        
+        view = memoryview(bytearray(UPLOAD_CHUNK_SIZE))
+        while n := source.readinto(view):
+            digest.update(view[:n])
+            buffer.write(view[:n])
+    return digest.hexdigest()
+
+async def save_upload(file: UploadFile, path: Union[str, Path]) -> str:
+    """
+    Copy an uploaded file to disk without blocking the event loop.
+    
+    The whole copy runs in one worker thread, reading into a single 1 MiB
+    buffer instead of allocating a new chunk per read.
+    
+    Args:
+        file: The uploaded file
+        path: Destination path
+        
+    Returns:
+        SHA-256 hex digest of the uploaded bytes
+    """
+    return await run_in_threadpool(_copy_upload, file.file, path)
+
+async def read_upload(file: UploadFile) -> Tuple[bytes, str]:
+    """
+    Read an uploaded file into memory.
+    
+    Args:
+        file: The uploaded file
+        
+    Returns:
+        Tuple of the uploaded bytes and their SHA-256 hex digest
+    """
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        digest.update(chunk)
+        buffer.write(chunk)
+    return buffer.getvalue(), digest.hexdigest()
+
+# Most recent detection results by content key, kept in memory in front of cache_manager
+RECENT_RESULTS_SIZE = 256
+# Entries are (expiry on the monotonic clock, result) and expire after cache_manager.ttl
+_recent_results: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+def recall_result(key: str) -> Optional[Dict[str, Any]]:
+    """Return a recently computed detection result, marking it as most recently used."""
+    entry = _recent_results.get(key)
+    if entry is None:
+        return None
+    expires_at, result = entry
+    if expires_at <= time.monotonic():
+        del _recent_results[key]
+        return None
+    _recent_results.move_to_end(key)
+    return result
+
+def remember_result(key: str, result: Dict[str, Any]) -> None:
+    """Store a detection result, evicting the least recently used one when full."""
+    _recent_results[key] = (time.monotonic() + cache_manager.ttl, result)
+    _recent_results.move_to_end(key)
+    if len(_recent_results) > RECENT_RESULTS_SIZE:
+        _recent_results.popitem(last=False)
+
+def content_cache_key(content_hash: str, detector_config: Dict[str, Any]) -> str:
+    """
+    Build a cache key for an exact upload and the detector settings used on it.
+    
+    Args:
+        content_hash: SHA-256 hex digest of the uploaded bytes
+        detector_config: Detector configuration
+        
+    Returns:
+        Cache key string
+    """
+    config_hash = hashlib.sha256(
+        json.dumps(detector_config, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+    return f"sha256_{content_hash}_{config_hash}"
+
+@app.on_event("startup")
+def init_cpu_pool():
+    """Start the worker processes that run detection and rendering."""
+    # Workers are spawned rather than forked: the server process already runs
+    # threads (the event loop, the threadpool, or an embedding test harness),
+    # and a forked child can deadlock on locks held by them
+    app.state.cpu_pool = ProcessPoolExecutor(
+        max_workers=os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+# Leftover uploads older than TEMP_FILE_TTL seconds are swept periodically
+TEMP_SWEEP_INTERVAL = 60
+TEMP_FILE_TTL = 3600
+
+def sweep_temp_uploads(max_age: float = TEMP_FILE_TTL) -> int:
+    """
+    Remove files in temp_uploads that were last modified more than max_age seconds ago.
+    
+    Args:
+        max_age: Maximum file age in seconds
+        
+    Returns:
+        Number of removed files
+    """
+    cutoff = time.time() - max_age
+    removed = 0
+    with os.scandir(TEMP_DIR) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+            except OSError:
+                # Removed concurrently by its request handler
+                pass
+    return removed
+
+async def _sweep_loop():
+    """Sweep temp_uploads every TEMP_SWEEP_INTERVAL seconds until cancelled."""
+    while True:
+        await asyncio.sleep(TEMP_SWEEP_INTERVAL)
+        try:
+            await run_in_threadpool(sweep_temp_uploads)
+        except OSError as e:
+            print(f"Warning: Failed to sweep {TEMP_DIR}: {e}")
+
+@app.on_event("startup")
+async def start_temp_sweeper():
+    """Start the background cleanup of temp_uploads."""
+    app.state.sweep_task = asyncio.create_task(_sweep_loop())
+
+def make_detector_config(enable_ocr: bool, languages_list: List[str],
+                         enable_cache: bool, enhance_image: bool) -> Dict[str, Any]:
+    """Build the detector configuration for an extraction request."""
+    return {
+        "ocr_enabled": enable_ocr,
+        "ocr_languages": languages_list,
+        "caching_enabled": enable_cache,
+        "enhancer": {
+            "enabled": enhance_image
+        }
+    }
+
+async def run_extraction(image_data: bytes,
+                         content_hash: str,
+                         detector_config: Dict[str, Any],
+                         output_format: str,
+                         visualize: bool) -> Dict[str, Any]:
+    """
+    Detect a graph in one uploaded image and build the API response for it.
+    
+    Args:
+        image_data: Encoded image file contents
+        content_hash: SHA-256 hex digest of image_data
+        detector_config: Detector configuration
+        output_format: Format to save the graph (gexf, graphml, gml)
+        visualize: Whether to generate visualization
+        
+    Returns:
+        Dictionary with graph data and file paths
+    """
+    enable_ocr = detector_config["ocr_enabled"]
+    enable_cache = detector_config["caching_enabled"]
+    
+    # Generate a unique ID for this job
+    job_id = uuid.uuid4().hex
+    
+    # Byte-identical repeats are served from the cache without
+    # running the perceptual hash or the detection pipeline
+    detection_result = None
+    if enable_cache:
+        cache_key = content_cache_key(content_hash, detector_config)
+        detection_result = recall_result(cache_key)
+        if detection_result is None:
+            detection_result = await run_in_threadpool(cache_manager.get, cache_key)
+            if detection_result is not None:
+                remember_result(cache_key, detection_result)
+    
+    # Generate output paths
+    graph_output_path = str(OUTPUT_DIR / f"{job_id}_graph.{output_format}")
+    vis_output_path = None
+    if visualize:
+        vis_output_path = str(OUTPUT_DIR / f"{job_id}_visualization.png")
+    
+    # Detect (unless cached), save the graph and render the visualization
+    # in a worker process so the event loop keeps serving other requests
+    cached = detection_result is not None
+    loop = asyncio.get_running_loop()
+    detection_result = await loop.run_in_executor(
+        app.state.cpu_pool, worker.extract,
+        image_data, detector_config, graph_output_path,
+        output_format, vis_output_path, detection_result
+    )
+    if enable_cache and not cached:
+        await run_in_threadpool(cache_manager.set, cache_key, detection_result)
+        remember_result(cache_key, detection_result)
+    
+    # Extract text labels from nodes if available
+    node_labels = {}
+    if enable_ocr:
+        for node in detection_result.get("nodes", []):
+            if "label" in node and node["label"]:
+                node_labels[node["id"]] = {
+                    "text": node["label"],
+                    "confidence": node.get("label_confidence", 0)
+                }
+    
+    # Prepare response
+    response = {
+        "job_id": job_id,
+        "nodes_count": len(detection_result["nodes"]),
+        "edges_count": len(detection_result["edges"]),
+        "graph_file": graph_output_path,
+        "quality_info": detection_result.get("quality_info", {})
+    }
+    
+    if enable_ocr:
+        response["text_found"] = len(detection_result.get("text_regions", [])) > 0
+        response["node_labels"] = node_labels
+        
+    if visualize and vis_output_path:
+        response["visualization_file"] = vis_output_path
+        
+    return response
 
 @app.post("/extract_graph/")
 async def extract_graph(
@@ -69,81 +338,78 @@ async def extract_graph(
     # Process OCR languages
     languages_list = [lang.strip() for lang in ocr_languages.split(",")]
     
-    # Generate a unique ID for this job
-    job_id = str(uuid.uuid4())
-    
-    # Create a temporary file
-    input_file_path = os.path.join("temp_uploads", f"{job_id}_{file.filename}")
-    
     try:
-        # Save uploaded file
-        with open(input_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Keep the upload in memory, hashing its bytes on the way; the worker
+        # decodes it directly instead of round-tripping through temp_uploads
+        image_data, content_hash = await read_upload(file)
         
         # Configure the detector
-        detector_config = {
-            "ocr_enabled": enable_ocr,
-            "ocr_languages": languages_list,
-            "caching_enabled": enable_cache,
-            "enhancer": {
-                "enabled": enhance_image
-            }
-        }
-        
-        # Process the image
-        detector = GraphDetector(config=detector_config)
-        detection_result = detector.detect(input_file_path)
-        
-        # Build networkx graph
-        builder = NetworkXBuilder()
-        graph = builder.build_graph(detection_result)
-        
-        # Generate output paths
-        graph_output_path = os.path.join("output", f"{job_id}_graph.{output_format}")
-        vis_output_path = None
-        
-        # Save the graph
-        builder.save_graph(graph, graph_output_path, format=output_format)
-        
-        # Generate visualization if requested
-        if visualize:
-            vis_output_path = os.path.join("output", f"{job_id}_visualization.png")
-            builder.visualize_graph(graph, vis_output_path)
-        
-        # Extract text labels from nodes if available
-        node_labels = {}
-        if enable_ocr:
-            for node in detection_result.get("nodes", []):
-                if "label" in node and node["label"]:
-                    node_labels[node["id"]] = {
-                        "text": node["label"],
-                        "confidence": node.get("label_confidence", 0)
-                    }
-        
-        # Prepare response
-        response = {
-            "job_id": job_id,
-            "nodes_count": len(graph.nodes),
-            "edges_count": len(graph.edges),
-            "graph_file": graph_output_path,
-            "quality_info": detection_result.get("quality_info", {})
-        }
+        detector_config = make_detector_config(
+            enable_ocr, languages_list, enable_cache, enhance_image
+        )
         
-        if enable_ocr:
-            response["text_found"] = len(detection_result.get("text_regions", [])) > 0
-            response["node_labels"] = node_labels
-            
-        if visualize and vis_output_path:
-            response["visualization_file"] = vis_output_path
-            
-        return response
+        return await run_extraction(
+            image_data, content_hash, detector_config, output_format, visualize
+        )
         
     except Exception as e:
-        # Clean up in case of error
-        if os.path.exists(input_file_path):
-            os.remove(input_file_path)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/extract_graph_batch/")
+async def extract_graph_batch(
+    files: List[UploadFile] = File(...),
+    output_format: str = Form("gexf"),
+    visualize: bool = Form(False),
+    enable_ocr: bool = Form(True),
+    enable_cache: bool = Form(True),
+    enhance_image: bool = Form(True),
+    ocr_languages: str = Form("en")
+):
+    """
+    Extract graph structures from several uploaded images in one request.
+    
+    All images share the same settings and are processed concurrently in
+    the worker pool. A failure on one image does not fail the others.
+    
+    Args:
+        files: The image files to process
+        output_format: Format to save the graphs (gexf, graphml, gml)
+        visualize: Whether to generate visualizations
+        enable_ocr: Enable OCR for text recognition
+        enable_cache: Enable caching of results
+        enhance_image: Apply image enhancement
+        ocr_languages: Languages for OCR (comma-separated)
+        
+    Returns:
+        List with one extract_graph response per file, in upload order;
+        failed files get a dictionary with "filename" and "error" instead
+    """
+    # Validate output format
+    if output_format not in ["gexf", "graphml", "gml"]:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Unsupported output format: {output_format}"
+        )
+    
+    # Process OCR languages
+    languages_list = [lang.strip() for lang in ocr_languages.split(",")]
+    
+    # Configure the detector
+    detector_config = make_detector_config(
+        enable_ocr, languages_list, enable_cache, enhance_image
+    )
+    
+    async def extract_one(file: UploadFile) -> Dict[str, Any]:
+        try:
+            image_data, content_hash = await read_upload(file)
+            return await run_extraction(
+                image_data, content_hash, detector_config, output_format, visualize
+            )
+        except Exception as e:
+            return {"filename": file.filename, "error": str(e)}
+    
+    return await asyncio.gather(*(extract_one(file) for file in files))
+
 @app.get("/download/{file_path:path}")
 async def download_file(file_path: str):
     """
@@ -157,18 +423,28 @@ async def download_file(file_path: str):
     """
     # Ensure the file is from our output directory
     if not file_path.startswith("output/"):
-        file_path = os.path.join("output", file_path)
+        file_path = str(OUTPUT_DIR / file_path)
         
-    if not os.path.exists(file_path):
+    # A single stat both checks existence and is handed to FileResponse,
+    # which would otherwise stat the file again
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
         raise HTTPException(status_code=404, detail="File not found")
         
-    return FileResponse(file_path)
+    return FileResponse(
+        file_path,
+        stat_result=stat_result,
+        media_type="application/octet-stream",
+        filename=os.path.basename(file_path)
+    )
 
 @app.post("/clear_cache/")
 async def clear_cache():
     """Clear the cache."""
     try:
-        cache_manager.clear()
+        _recent_results.clear()
+        await run_in_threadpool(cache_manager.clear)
         return {"status": "success", "message": "Cache cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -185,19 +461,18 @@ async def analyze_image_quality(file: UploadFile = File(...)):
         Quality analysis results
     """
     # Generate a unique ID for this job
-    job_id = str(uuid.uuid4())
+    job_id = uuid.uuid4().hex
     
     # Create a temporary file
-    input_file_path = os.path.join("temp_uploads", f"{job_id}_{file.filename}")
+    input_file_path = TEMP_DIR / f"{job_id}_{safe_filename(file.filename)}"
     
     try:
         # Save uploaded file
-        with open(input_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await save_upload(file, input_file_path)
         
         # Load the image
         import cv2
-        image = cv2.imread(input_file_path)
+        image = cv2.imread(str(input_file_path))
         if image is None:
             raise ValueError("Could not read image")
         
@@ -212,19 +487,18 @@ async def analyze_image_quality(file: UploadFile = File(...)):
         }
         
     except Exception as e:
-        # Clean up in case of error
-        if os.path.exists(input_file_path):
-            os.remove(input_file_path)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         # Always clean up
-        if os.path.exists(input_file_path):
-            os.remove(input_file_path)
+        input_file_path.unlink(missing_ok=True)
 
 @app.on_event("shutdown")
 def cleanup():
-    """Clean up temporary files when shutting down."""
-    shutil.rmtree("temp_uploads", ignore_errors=True)
+    """Stop background work and clean up temporary files when shutting down."""
+    app.state.sweep_task.cancel()
+    app.state.cpu_pool.shutdown()
+    cache_manager.close()
+    shutil.rmtree(TEMP_DIR, ignore_errors=True)
 
 def start_server():
     """Start the API server."""
@@ -0,0 +1,82 @@
+"""
+CPU-bound work for the API, run in a process pool outside the event loop.
+"""
+from collections import OrderedDict
+import json
+import numpy as np
+import cv2
+from typing import Optional, Dict, Any
+
+from graphextractor.detector import GraphDetector
+from graphextractor.graph_builder import NetworkXBuilder
+
+# Detectors load OCR models on construction, so each worker process keeps
+# one instance per distinct configuration and reuses it for later jobs
+DETECTOR_POOL_SIZE = 8
+_detectors: "OrderedDict[str, GraphDetector]" = OrderedDict()
+_builder: Optional[NetworkXBuilder] = None
+
+def get_detector(detector_config: Dict[str, Any]) -> GraphDetector:
+    """
+    Return this process's detector for a configuration, creating it if needed.
+    
+    Args:
+        detector_config: Detector configuration
+    
+    Returns:
+        GraphDetector instance
+    """
+    key = json.dumps(detector_config, sort_keys=True)
+    detector = _detectors.get(key)
+    if detector is None:
+        detector = GraphDetector(config=detector_config)
+        _detectors[key] = detector
+        if len(_detectors) > DETECTOR_POOL_SIZE:
+            _, evicted = _detectors.popitem(last=False)
+            evicted.close()
+    _detectors.move_to_end(key)
+    return detector
+
+def get_builder() -> NetworkXBuilder:
+    """Return this process's graph builder."""
+    global _builder
+    if _builder is None:
+        _builder = NetworkXBuilder()
+    return _builder
+
+def extract(image_data: bytes,
+            detector_config: Dict[str, Any],
+            graph_output_path: str,
+            output_format: str = "gexf",
+            vis_output_path: Optional[str] = None,
+            detection_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Detect a graph in an image and write the graph and visualization files.
+    
+    Args:
+        image_data: Encoded image file contents
+        detector_config: Detector configuration
+        graph_output_path: Path to save the graph
+        output_format: Graph file format (gexf, graphml, gml)
+        vis_output_path: Path to save the visualization, or None to skip it
+        detection_result: Previously computed detection result; when given,
+            detection is skipped and only the output files are written
+    
+    Returns:
+        Detection result
+    """
+    if detection_result is None:
+        image = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Could not decode uploaded image")
+        detection_result = get_detector(detector_config).detect(image)
+    
+    # Graph building and pyplot rendering stay in the worker as well;
+    # pyplot is not thread-safe, and each process has its own state
+    builder = get_builder()
+    graph = builder.build_graph(detection_result)
+    builder.save_graph(graph, graph_output_path, format=output_format)
+    if vis_output_path:
+        builder.visualize_graph(graph, vis_output_path)
+    
+    return detection_result
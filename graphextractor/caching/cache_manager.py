@@ -1,8 +1,10 @@
 import json
 import os
 import time
-from typing import Dict, Any, Optional, Union
-import pickle
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional, Union
+import numpy as np
 
 try:
     import redis
@@ -10,6 +12,50 @@ try:
 except ImportError:
     REDIS_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+def _to_builtin(obj: Any) -> Any:
+    """Convert numpy values that serializers do not handle natively."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+def _dumps_json(data: Dict[str, Any]) -> bytes:
+    """Serialize a payload to compact JSON bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, separators=(",", ":"), default=_to_builtin).encode("utf-8")
+
+def _loads_json(payload: bytes) -> Dict[str, Any]:
+    """Deserialize a JSON payload."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+def _dumps_msgpack(data: Dict[str, Any]) -> bytes:
+    """Serialize a payload for Redis (msgpack, or JSON if unavailable)."""
+    if MSGPACK_AVAILABLE:
+        return msgpack.packb(data, use_bin_type=True, default=_to_builtin)
+    return _dumps_json(data)
+
+def _loads_msgpack(payload: bytes) -> Dict[str, Any]:
+    """Deserialize a payload read from Redis."""
+    if MSGPACK_AVAILABLE:
+        return msgpack.unpackb(payload, raw=False)
+    return _loads_json(payload)
+
 class CacheManager:
     """Manager for caching detection results."""
     
@@ -20,7 +66,7 @@ class CacheManager:
         Initialize the cache manager.
         
         Args:
-            cache_dir: Directory for local file cache
+            cache_dir: Directory for the local SQLite cache
             redis_url: Redis connection URL (e.g. redis://localhost:6379/0)
             ttl: Time-to-live for cache entries in seconds
         """
@@ -32,6 +78,21 @@ class CacheManager:
         # Initialize cache directory
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
+        
+        # Local cache: a single SQLite database in WAL mode instead of one
+        # JSON file per entry. The connection is shared between threads,
+        # so statements are serialized with a lock.
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            os.path.join(cache_dir, "cache.db"), check_same_thread=False
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, payload BLOB NOT NULL)"
+        )
+        self.conn.commit()
             
         # Initialize Redis if URL provided and library available
         if redis_url and REDIS_AVAILABLE:
@@ -57,24 +118,35 @@ class CacheManager:
         if self.redis_client:
             data = self.redis_client.get(f"graphextractor:{key}")
             if data:
-                return pickle.loads(data)
-        
-        # Fall back to file cache
-        cache_file = os.path.join(self.cache_dir, f"{key}.json")
+                try:
+                    return _loads_msgpack(data)
+                except Exception:
+                    # Entry written in an older or unknown format
+                    pass
         
-        if os.path.exists(cache_file):
-            # Check if file is not expired
-            mod_time = os.path.getmtime(cache_file)
-            if time.time() - mod_time < self.ttl:
-                with open(cache_file, 'r') as f:
-                    try:
-                        return json.load(f)
-                    except json.JSONDecodeError:
-                        # Invalid cache file
-                        os.remove(cache_file)
-            else:
-                # Expired cache file
-                os.remove(cache_file)
+        # Fall back to local cache
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT expires_at, payload FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            expires_at, payload = row
+            if expires_at > time.time():
+                try:
+                    return _loads_json(payload)
+                except ValueError:
+                    # Invalid cache entry
+                    pass
+            
+            # Expired or invalid cache entry; another process may hold the
+            # write lock, in which case the entry is left for a later read
+            try:
+                self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.conn.commit()
+            except Exception:
+                pass
                 
         return None
     
@@ -92,24 +164,27 @@ class CacheManager:
         # Try Redis first if available
         if self.redis_client:
             try:
-                pickled_data = pickle.dumps(data)
+                packed_data = _dumps_msgpack(data)
                 return self.redis_client.setex(
                     f"graphextractor:{key}", 
                     self.ttl,
-                    pickled_data
+                    packed_data
                 )
             except Exception as e:
                 print(f"Warning: Failed to store in Redis: {e}")
         
-        # Fall back to file cache
-        cache_file = os.path.join(self.cache_dir, f"{key}.json")
-        
+        # Fall back to local cache
         try:
-            with open(cache_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            payload = _dumps_json(data)
+            with self._lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, expires_at, payload) VALUES (?, ?, ?)",
+                    (key, time.time() + self.ttl, payload)
+                )
+                self.conn.commit()
             return True
         except Exception as e:
-            print(f"Warning: Failed to write cache file: {e}")
+            print(f"Warning: Failed to write cache entry: {e}")
             return False
     
     def invalidate(self, key: str) -> bool:
@@ -131,13 +206,13 @@ class CacheManager:
             except Exception:
                 success = False
         
-        # Remove file cache
-        cache_file = os.path.join(self.cache_dir, f"{key}.json")
-        if os.path.exists(cache_file):
-            try:
-                os.remove(cache_file)
-            except Exception:
-                success = False
+        # Remove from local cache
+        try:
+            with self._lock:
+                self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.conn.commit()
+        except Exception:
+            success = False
                 
         return success
     
@@ -153,16 +228,57 @@ class CacheManager:
         # Clear Redis cache if available
         if self.redis_client:
             try:
-                self.redis_client.delete(self.redis_client.keys("graphextractor:*") or [])
+                # SCAN walks the keyspace incrementally instead of blocking the
+                # server like KEYS; UNLINK frees the values in the background
+                pipe = self.redis_client.pipeline(transaction=False)
+                cursor = 0
+                while True:
+                    cursor, keys = self.redis_client.scan(
+                        cursor, match="graphextractor:*", count=1000
+                    )
+                    if keys:
+                        pipe.unlink(*keys)
+                    if cursor == 0:
+                        break
+                pipe.execute()
             except Exception:
                 success = False
         
-        # Clear file cache
-        for filename in os.listdir(self.cache_dir):
-            if filename.endswith(".json"):
-                try:
-                    os.remove(os.path.join(self.cache_dir, filename))
-                except Exception:
-                    success = False
+        # Clear local cache
+        try:
+            with self._lock:
+                self.conn.execute("DELETE FROM cache")
+                self.conn.commit()
+        except Exception:
+            success = False
+        
+        # Per-key JSON files left over from the old file cache are no longer
+        # read, so they are removed in the background instead of inline
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                legacy_files = [
+                    entry.path for entry in entries
+                    if entry.name.endswith(".json") and entry.is_file()
+                ]
+        except OSError:
+            legacy_files = []
+        if legacy_files:
+            threading.Thread(
+                target=self._remove_files, args=(legacy_files,), daemon=True
+            ).start()
                     
         return success
+    
+    @staticmethod
+    def _remove_files(paths: List[str]) -> None:
+        """Remove files, ignoring ones that are already gone."""
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+    
+    def close(self) -> None:
+        """Close the local cache database connection."""
+        with self._lock:
+            self.conn.close()
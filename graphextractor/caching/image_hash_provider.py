@@ -1,12 +1,21 @@
+import os
+import functools
 import numpy as np
 import cv2
-import imagehash
 from typing import Union, Tuple
-from PIL import Image
-import io
+
+# cv2.img_hash ships with opencv-contrib-python(-headless) only; the default
+# opencv-python-headless install uses the NumPy pHash/dHash fallback below.
+# Hashes from the two backends differ, so a cache is tied to one of them.
+IMG_HASH_AVAILABLE = hasattr(cv2, "img_hash")
 
 class ImageHashProvider:
-    """Generate perceptual hashes for images to use as cache keys."""
+    """
+    Generate perceptual hashes for images to use as cache keys.
+    
+    Uses cv2.img_hash when OpenCV is built with the contrib modules and
+    falls back to pHash/dHash computed with NumPy otherwise.
+    """
     
     def __init__(self, hash_size: int = 8, 
                 scale_width: int = 256, 
@@ -15,52 +24,93 @@ class ImageHashProvider:
         Initialize the image hasher.
         
         Args:
-            hash_size: Size of hash in bits
+            hash_size: Hash side length in bits (used by the fallback hashes)
             scale_width: Width to scale images to before hashing
             scale_height: Height to scale images to before hashing
         """
         self.hash_size = hash_size
         self.scale_width = scale_width
         self.scale_height = scale_height
+        
+        # Hashes of files already seen, keyed by (path, mtime_ns, size)
+        self._hash_for_path = functools.lru_cache(maxsize=1024)(self._hash_file)
     
     def compute_hash(self, image: Union[str, np.ndarray]) -> str:
         """
         Compute a perceptual hash for the image.
         
+        Hashes of image files are remembered per (path, mtime, size), so
+        hashing an unchanged file again costs a single stat call. A path and
+        the BGR image loaded from it give the same hash.
+        
         Args:
             image: Image path or numpy array
-            
+        
         Returns:
             Hash string
         """
-        # Load image if path is provided
         if isinstance(image, str):
-            pil_image = Image.open(image)
-        else:
-            # Convert OpenCV image to PIL
-            if len(image.shape) > 2 and image.shape[2] == 3:
-                # Convert BGR to RGB
-                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            else:
-                # Grayscale
-                image_rgb = image
-                
-            pil_image = Image.fromarray(image_rgb)
-            
-        # Resize image for consistency
-        pil_image = pil_image.resize(
-            (self.scale_width, self.scale_height), 
-            Image.LANCZOS
+            try:
+                st = os.stat(image)
+            except OSError:
+                raise ValueError(f"Could not load image from {image}")
+            return self._hash_for_path(image, st.st_mtime_ns, st.st_size)
+        return self._compute_hash(image)
+    
+    def _hash_file(self, path: str, mtime_ns: int, size: int) -> str:
+        """Hash an image file; mtime_ns and size only take part in the LRU key."""
+        return self._compute_hash(path)
+    
+    def _compute_hash(self, image: Union[str, np.ndarray]) -> str:
+        """Compute the perceptual hash without consulting the LRU."""
+        if isinstance(image, str):
+            # Decode in color so that files go through exactly the same
+            # resize and conversion as images passed in as arrays
+            path = image
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError(f"Could not load image from {path}")
+        
+        # Resize image for consistency; done before the color conversion so
+        # that only the small image is converted, not the full-resolution one
+        small = cv2.resize(
+            image,
+            (self.scale_width, self.scale_height),
+            interpolation=cv2.INTER_AREA
         )
-            
-        # Compute different types of hashes and combine them
-        phash = imagehash.phash(pil_image, hash_size=self.hash_size)
-        dhash = imagehash.dhash(pil_image, hash_size=self.hash_size)
         
-        # Combine hashes to make it more robust
-        combined_hash = str(phash) + "_" + str(dhash)
+        # Perceptual hashes only look at luminance, so hash a grayscale image
+        if len(small.shape) > 2 and small.shape[2] == 3:
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = small
+        
+        if IMG_HASH_AVAILABLE:
+            phash = cv2.img_hash.pHash(gray)
+            block_hash = cv2.img_hash.blockMeanHash(gray)
+            return phash.tobytes().hex() + "_" + block_hash.tobytes().hex()
         
-        return combined_hash
+        # Fallback for plain opencv-python builds
+        phash = self._phash(gray, self.hash_size)
+        dhash = self._dhash(gray, self.hash_size)
+        
+        # Combine hashes to make it more robust
+        return phash + "_" + dhash
+    
+    @staticmethod
+    def _dhash(gray: np.ndarray, hash_size: int) -> str:
+        """Difference hash computed entirely on uint8 pixels."""
+        small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+        diff = small[:, 1:] > small[:, :-1]
+        return np.packbits(diff).tobytes().hex()
+    
+    @staticmethod
+    def _phash(gray: np.ndarray, hash_size: int) -> str:
+        """DCT-based perceptual hash of the low-frequency coefficients."""
+        small = cv2.resize(gray, (hash_size * 4, hash_size * 4), interpolation=cv2.INTER_AREA)
+        low_freq = cv2.dct(small.astype(np.float32))[:hash_size, :hash_size]
+        diff = low_freq > np.median(low_freq)
+        return np.packbits(diff).tobytes().hex()
     
     def are_similar(self, hash1: str, hash2: str, threshold: int = 10) -> bool:
         """
@@ -70,25 +120,24 @@ class ImageHashProvider:
             hash1: First hash string
             hash2: Second hash string
             threshold: Maximum difference to be considered similar
-            
+        
         Returns:
             True if images are similar, False otherwise
         """
         # Split combined hashes
-        phash1, dhash1 = hash1.split("_")
-        phash2, dhash2 = hash2.split("_")
+        first1, second1 = hash1.split("_")
+        first2, second2 = hash2.split("_")
         
-        # Convert string hashes to imagehash objects
-        phash1 = imagehash.hex_to_hash(phash1)
-        dhash1 = imagehash.hex_to_hash(dhash1)
-        phash2 = imagehash.hex_to_hash(phash2)
-        dhash2 = imagehash.hex_to_hash(dhash2)
-        
-        # Calculate differences
-        phash_diff = phash1 - phash2
-        dhash_diff = dhash1 - dhash2
+        # Calculate Hamming distances between the hex-encoded bit strings
+        first_diff = self._hamming_distance(first1, first2)
+        second_diff = self._hamming_distance(second1, second2)
         
         # Average difference
-        avg_diff = (phash_diff + dhash_diff) / 2
+        avg_diff = (first_diff + second_diff) / 2
         
         return avg_diff <= threshold
+    
+    @staticmethod
+    def _hamming_distance(hex1: str, hex2: str) -> int:
+        """Count differing bits between two hex-encoded hashes."""
+        return bin(int(hex1, 16) ^ int(hex2, 16)).count("1")
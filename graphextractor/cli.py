@@ -1,8 +1,25 @@
 import argparse
 import os
+import multiprocessing
 from .detector import GraphDetector
 from .graph_builder import NetworkXBuilder
 
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif')
+
+# Detector and builder of the current process, created once by _init_worker
+_detector = None
+_builder = None
+
+def _init_worker():
+    """Create the detector and graph builder used by this process."""
+    global _detector, _builder
+    _detector = GraphDetector()
+    _builder = NetworkXBuilder()
+
+def _process_job(job):
+    """Unpack a (file_path, output_dir, output_format, visualize) job for Pool.imap_unordered."""
+    return process_file(*job)
+
 def main():
     """Command line interface for graph extractor."""
     parser = argparse.ArgumentParser(
@@ -33,12 +50,19 @@ def main():
     
     # Process single file or directory
     if os.path.isfile(args.input):
-        process_file(args.input, args.output, args.format, args.visualize)
+        print(process_file(args.input, args.output, args.format, args.visualize))
     elif os.path.isdir(args.input):
-        for filename in os.listdir(args.input):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif')):
-                file_path = os.path.join(args.input, filename)
-                process_file(file_path, args.output, args.format, args.visualize)
+        jobs = [
+            (os.path.join(args.input, filename), args.output, args.format, args.visualize)
+            for filename in os.listdir(args.input)
+            if filename.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        # Images are independent, so process them on all cores; workers
+        # return their messages and only this process prints
+        with multiprocessing.Pool(processes=os.cpu_count(),
+                                  initializer=_init_worker) as pool:
+            for message in pool.imap_unordered(_process_job, jobs, chunksize=4):
+                print(message)
     else:
         print(f"Error: {args.input} is not a valid file or directory")
         return 1
@@ -46,35 +70,40 @@ def main():
     return 0
 
 def process_file(file_path, output_dir, output_format, visualize):
-    """Process a single image file."""
+    """Process a single image file and return a report of what was saved."""
+    if _detector is None:
+        _init_worker()
+    
     try:
-        print(f"Processing {file_path}...")
+        messages = [f"Processing {file_path}..."]
         
         # Extract base filename without extension
         base_name = os.path.splitext(os.path.basename(file_path))[0]
         
         # Detect graph elements
-        detector = GraphDetector()
-        detection_result = detector.detect(file_path)
+        detection_result = _detector.detect(file_path)
         
         # Build graph
-        builder = NetworkXBuilder()
+        builder = _builder
         graph = builder.build_graph(detection_result)
         
         # Save graph
         graph_output_path = os.path.join(output_dir, f"{base_name}.{output_format}")
         builder.save_graph(graph, graph_output_path, format=output_format)
         
-        print(f"Saved graph with {len(graph.nodes)} nodes and {len(graph.edges)} edges to {graph_output_path}")
+        messages.append(f"Saved graph with {len(detection_result['nodes'])} nodes and "
+                        f"{len(detection_result['edges'])} edges to {graph_output_path}")
         
         # Generate visualization if requested
         if visualize:
             vis_output_path = os.path.join(output_dir, f"{base_name}_graph.png")
             builder.visualize_graph(graph, vis_output_path)
-            print(f"Visualization saved to {vis_output_path}")
+            messages.append(f"Visualization saved to {vis_output_path}")
+        
+        return "\n".join(messages)
             
     except Exception as e:
-        print(f"Error processing {file_path}: {str(e)}")
+        return f"Error processing {file_path}: {str(e)}"
 
 if __name__ == "__main__":
     exit(main())
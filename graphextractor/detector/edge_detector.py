@@ -1,20 +1,35 @@
+import logging
 import cv2
 import numpy as np
 from typing import Dict, List, Tuple
-from skimage.morphology import skeletonize
-from skimage import img_as_bool, img_as_ubyte
+from scipy.spatial import cKDTree
+
+from ..utils import cuda_available
+
+# cv2.ximgproc ships with opencv-contrib-python only
+XIMGPROC_AVAILABLE = hasattr(cv2, "ximgproc")
+
+log = logging.getLogger(__name__)
 
 class EdgeDetector:
     """Class for detecting edges connecting nodes in graph images."""
     
-    def __init__(self, line_thickness_threshold: int = 5):
+    def __init__(self, line_thickness_threshold: int = 5, use_gpu: bool = False):
         """
         Initialize the edge detector.
         
         Args:
             line_thickness_threshold: Maximum thickness to consider as a line
+            use_gpu: Run the Hough transform on a CUDA device when one is available
         """
         self.line_thickness_threshold = line_thickness_threshold
+        
+        # Probe CUDA once; falls back to cv2.HoughLinesP without it
+        self._gpu_hough = None
+        if use_gpu and cuda_available():
+            self._gpu_hough = cv2.cuda.createHoughSegmentDetector(
+                1, np.pi/180, minLineLength=30, maxLineGap=10, threshold=10
+            )
     
     def detect(self, image: np.ndarray, nodes: List[Dict]) -> List[Dict]:
         """
@@ -39,73 +54,121 @@ class EdgeDetector:
         )
         
         # Create a mask for nodes to exclude them from edge detection
-        node_mask = np.zeros_like(binary)
-        for node in nodes:
-            if node.get("is_likely_node", True):
-                x, y, w, h = node["bounding_box"]
-                # Add padding around the node
-                padding = 5
-                x_min = max(0, x - padding)
-                y_min = max(0, y - padding)
-                x_max = min(binary.shape[1], x + w + padding)
-                y_max = min(binary.shape[0], y + h + padding)
-                node_mask[y_min:y_max, x_min:x_max] = 255
-        
-        # Subtract nodes from binary image
-        edges_only = cv2.subtract(binary, node_mask)
+        boxes = np.array(
+            [node["bounding_box"] for node in nodes if node.get("is_likely_node", True)],
+            dtype=np.int32
+        ).reshape(-1, 4)
+        if len(boxes):
+            # Padded node rectangles as (N, 4, 2) quads, filled in a single call;
+            # fillPoly clips to the image and includes the far corner pixels
+            padding = 5
+            x_min = boxes[:, 0] - padding
+            y_min = boxes[:, 1] - padding
+            x_max = boxes[:, 0] + boxes[:, 2] + padding - 1
+            y_max = boxes[:, 1] + boxes[:, 3] + padding - 1
+            quads = np.stack([
+                np.stack([x_min, y_min], axis=1),
+                np.stack([x_max, y_min], axis=1),
+                np.stack([x_max, y_max], axis=1),
+                np.stack([x_min, y_max], axis=1)
+            ], axis=1)
+            node_mask = np.zeros_like(binary)
+            cv2.fillPoly(node_mask, list(quads), 255)
+            
+            # Remove nodes from the binary image in place
+            cv2.bitwise_and(binary, cv2.bitwise_not(node_mask), dst=binary)
         
         # Skeletonize to thin the lines
-        skeleton = skeletonize(img_as_bool(edges_only))
-        skeleton_img = img_as_ubyte(skeleton)
+        skeleton_img = self._thin(binary)
         
         # Use HoughLinesP to detect line segments
-        lines = cv2.HoughLinesP(
-            skeleton_img, 1, np.pi/180, 
-            threshold=10, minLineLength=30, maxLineGap=10
-        )
+        lines = self._detect_lines(skeleton_img)
         
         edges = []
-        if lines is not None:
-            for i, line in enumerate(lines):
-                x1, y1, x2, y2 = line[0]
-                
-                # Find which nodes this line connects
-                source_node = None
-                target_node = None
-                min_start_dist = float('inf')
-                min_end_dist = float('inf')
-                
-                for node in nodes:
-                    # DEBUG: print node position type and value
-                    print(f"DEBUG: node['position'] type={type(node['position'])}, value={node['position']}")
-                    node_pos = node["position"]
-                    if not (isinstance(node_pos, (list, tuple)) and len(node_pos) == 2):
-                        node_pos = (0, 0)
-                    node_x, node_y = node_pos
-                    
-                    # Calculate distance to line start
-                    start_dist = np.sqrt((node_x - x1)**2 + (node_y - y1)**2)
-                    if start_dist < min_start_dist:
-                        min_start_dist = start_dist
-                        source_node = node["id"]
-                        
-                    # Calculate distance to line end
-                    end_dist = np.sqrt((node_x - x2)**2 + (node_y - y2)**2)
-                    if end_dist < min_end_dist:
-                        min_end_dist = end_dist
-                        target_node = node["id"]
-                
-                # Only add valid edges
-                if source_node is not None and target_node is not None and source_node != target_node:
-                    # Calculate edge length
-                    edge_length = np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-                    
-                    edges.append({
-                        "id": i,
-                        "source": source_node,
-                        "target": target_node,
-                        "weight": edge_length,
-                        "points": [(x1, y1), (x2, y2)]
-                    })
+        if lines is not None and nodes:
+            # Node positions as an (N, 2) array; invalid positions fall back to (0, 0)
+            node_ids = [node["id"] for node in nodes]
+            positions = np.asarray(
+                [self._node_position(node) for node in nodes], dtype=np.float32
+            )
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Matching %d line segments to node positions %s",
+                          len(lines), positions.tolist())
+            
+            # Line endpoints as (M, 4) array
+            segments = lines[:, 0, :]
+            num_lines = len(segments)
+            
+            # Find the nearest node to both endpoints of every segment in one query
+            tree = cKDTree(positions)
+            endpoints = np.concatenate(
+                [segments[:, :2], segments[:, 2:]], axis=0
+            ).astype(np.float32)
+            _, nearest = tree.query(endpoints, k=1, workers=-1)
+            source_idx = nearest[:num_lines]
+            target_idx = nearest[num_lines:]
+            
+            # Only keep segments connecting two different nodes, and only
+            # compute lengths for those
+            kept = np.flatnonzero(source_idx != target_idx)
+            kept_segments = segments[kept]
+            lengths = np.hypot(
+                kept_segments[:, 2] - kept_segments[:, 0],
+                kept_segments[:, 3] - kept_segments[:, 1]
+            )
+            
+            for i, (x1, y1, x2, y2), length in zip(kept, kept_segments, lengths):
+                edges.append({
+                    "id": int(i),
+                    "source": node_ids[source_idx[i]],
+                    "target": node_ids[target_idx[i]],
+                    "weight": float(length),
+                    "points": [(x1, y1), (x2, y2)]
+                })
         
         return edges
+    
+    def _detect_lines(self, skeleton_img: np.ndarray) -> np.ndarray:
+        """
+        Detect line segments in a thinned image.
+        
+        Args:
+            skeleton_img: Thinned binary image
+            
+        Returns:
+            Segments as an (M, 1, 4) array like cv2.HoughLinesP, or None
+        """
+        if self._gpu_hough is not None:
+            gpu_img = cv2.cuda_GpuMat()
+            gpu_img.upload(skeleton_img)
+            gpu_lines = self._gpu_hough.detect(gpu_img)
+            if gpu_lines.empty():
+                return None
+            # The CUDA detector returns a 1 x M row of segments
+            return gpu_lines.download().reshape(-1, 1, 4)
+        
+        return cv2.HoughLinesP(
+            skeleton_img, 1, np.pi/180, 
+            threshold=10, minLineLength=30, maxLineGap=10
+        )
+    
+    @staticmethod
+    def _thin(binary: np.ndarray) -> np.ndarray:
+        """Thin a {0, 255} uint8 image to one-pixel-wide lines."""
+        if XIMGPROC_AVAILABLE:
+            # Zhang-Suen thinning in C++, works on uint8 directly
+            return cv2.ximgproc.thinning(
+                binary, thinningType=cv2.ximgproc.THINNING_ZHANGSUEN
+            )
+        
+        from skimage.morphology import skeletonize
+        from skimage import img_as_bool, img_as_ubyte
+        return img_as_ubyte(skeletonize(img_as_bool(binary)))
+    
+    @staticmethod
+    def _node_position(node: Dict) -> Tuple[float, float]:
+        """Return the node position, or (0, 0) if it is malformed."""
+        node_pos = node["position"]
+        if not (isinstance(node_pos, (list, tuple)) and len(node_pos) == 2):
+            return (0, 0)
+        return node_pos
@@ -1,11 +1,55 @@
+import logging
 import cv2
 import numpy as np
-from typing import Dict, List, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor
+from scipy.spatial import cKDTree
+from typing import Dict, List, Tuple, Any, Optional, Union
 
 # Импортируем новые модули
 from ..preprocessing import ImageEnhancer, QualityAnalyzer
 from ..text_recognition import OCRProcessor, TextMapper
 from ..caching import CacheManager, ImageHashProvider
+from ..utils import cuda_available
+
+log = logging.getLogger(__name__)
+
+# Detected nodes as one contiguous record per node, before conversion to dicts
+NODE_DTYPE = np.dtype([
+    ("id", np.int32),
+    ("x", np.int32),
+    ("y", np.int32),
+    ("area", np.float64)
+])
+
+def nodes_to_dicts(nodes: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Convert a NODE_DTYPE array to the node dicts returned by GraphDetector.
+    
+    Args:
+        nodes: Structured array of nodes
+        
+    Returns:
+        List of node dictionaries
+    """
+    return [
+        {"id": node_id, "position": (x, y), "area": area}
+        for node_id, x, y, area in nodes.tolist()
+    ]
+
+def _otsu_threshold(hist: np.ndarray) -> int:
+    """Return the Otsu threshold for a 256-bin grayscale histogram."""
+    hist = hist.ravel().astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    
+    # Class weights and means for every candidate threshold t (class 0 is <= t)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    sum_bg = np.cumsum(hist * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_bg[-1] - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(np.nan_to_num(between)))
 
 class GraphDetector:
     """Main class for detecting graph structures in images."""
@@ -21,18 +65,29 @@ class GraphDetector:
         
         # Initialize preprocessing components
         self.enhancer = ImageEnhancer(self.config.get("enhancer", {}))
-        self.quality_analyzer = QualityAnalyzer()
+        self.quality_analyzer = QualityAnalyzer(
+            max_dimension=self.config.get("quality_max_dimension")
+        )
         
         # Initialize text recognition if enabled
         self.ocr_enabled = self.config.get("ocr_enabled", True)
         if self.ocr_enabled:
             self.ocr_processor = OCRProcessor(
                 languages=self.config.get("ocr_languages", ["en"]),
-                gpu=self.config.get("use_gpu", False)
+                gpu=self.config.get("use_gpu", False),
+                max_dimension=self.config.get("ocr_max_dimension", 1280)
             )
             self.text_mapper = TextMapper(
                 proximity_threshold=self.config.get("text_proximity_threshold", 50.0)
             )
+            # OCR runs on these threads while quality analysis and preprocessing
+            # continue on the caller's; both release the GIL in native code.
+            # With the default single thread, concurrent detect() calls on one
+            # detector run their OCR one after another; call close() when done
+            self._ocr_pool = ThreadPoolExecutor(
+                max_workers=self.config.get("ocr_workers", 1),
+                thread_name_prefix="graphextractor-ocr"
+            )
         
         # Initialize caching if enabled
         self.caching_enabled = self.config.get("caching_enabled", True)
@@ -44,69 +99,189 @@ class GraphDetector:
             )
             self.hash_provider = ImageHashProvider()
         
-    def detect(self, image_path: str) -> Dict[str, Any]:
+        # Keep preprocessing on a CUDA device when requested and present
+        self._gpu_blur = None
+        if self.config.get("use_gpu", False) and cuda_available():
+            self._gpu_blur = cv2.cuda.createGaussianFilter(
+                cv2.CV_8UC1, cv2.CV_8UC1, (5, 5), 0
+            )
+        
+    def close(self) -> None:
+        """Stop the OCR threads; in-flight OCR jobs still finish."""
+        if self.ocr_enabled:
+            self._ocr_pool.shutdown(wait=False)
+    
+    def detect(self, image_path: Union[str, np.ndarray],
+               quality_info: Optional[Dict[str, Any]] = None,
+               enhanced: Optional[np.ndarray] = None,
+               text_regions: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Detect graph structures in the given image.
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file or an already loaded BGR image
+            quality_info: Precomputed QualityAnalyzer.analyze() result for the image
+            enhanced: Precomputed ImageEnhancer.apply_adaptive_enhancement() result
+            text_regions: Precomputed OCRProcessor.extract_text() result for the image
             
         Returns:
             Dictionary containing detected graph elements
         """
+        # Use the image directly if it is already loaded
+        image = None
+        if isinstance(image_path, np.ndarray):
+            image = image_path
+            image_path = None
+        
         # Check cache first if enabled
         if self.caching_enabled:
-            # Load image for hash calculation
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"Could not load image from {image_path}")
-            
-            # Generate hash for the image
-            image_hash = self.hash_provider.compute_hash(image)
+            # Hash by path when possible: the provider remembers hashes of
+            # unchanged files, so a cache hit needs no image decoding at all
+            image_hash = self.hash_provider.compute_hash(
+                image if image is not None else image_path
+            )
             
             # Look up in cache
             cached_result = self.cache_manager.get(image_hash)
             if cached_result:
-                print(f"Using cached result for image: {image_path}")
+                print(f"Using cached result for image: {image_path or image_hash}")
                 return cached_result
-        else:
-            # Load the image if not already loaded for caching
+        
+        if image is None:
             image = cv2.imread(image_path)
             if image is None:
                 raise ValueError(f"Could not load image from {image_path}")
+        
+        result = self._run_pipeline(image, image_path, quality_info, enhanced, text_regions)
+        
+        # Cache result if enabled
+        if self.caching_enabled:
+            self.cache_manager.set(image_hash, result)
+            
+        return result
+    
+    def detect_batch(self, image_paths: List[str],
+                     max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Detect graph structures in several images.
+        
+        Images are loaded concurrently and OCR runs batched over all images
+        that are not already cached; the rest of the pipeline runs per image.
+        
+        Args:
+            image_paths: Paths to the image files
+            max_workers: Number of threads used to load images
+            
+        Returns:
+            Detection results in the order of image_paths
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(image_paths)
+        
+        # Serve cached images first so they are neither loaded nor OCR'd
+        pending = list(range(len(image_paths)))
+        image_hashes = {}
+        if self.caching_enabled:
+            pending = []
+            for index, path in enumerate(image_paths):
+                image_hashes[index] = self.hash_provider.compute_hash(path)
+                cached_result = self.cache_manager.get(image_hashes[index])
+                if cached_result:
+                    results[index] = cached_result
+                else:
+                    pending.append(index)
+        if not pending:
+            return results
+        
+        # cv2.imread releases the GIL, so threads overlap the decoding
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            images = list(pool.map(cv2.imread, [image_paths[i] for i in pending]))
+        for index, image in zip(pending, images):
+            if image is None:
+                raise ValueError(f"Could not load image from {image_paths[index]}")
+        
+        batch_text_regions = [None] * len(images)
+        if self.ocr_enabled:
+            print(f"Extracting text with OCR from {len(images)} images...")
+            batch_text_regions = self.ocr_processor.extract_text_batched(images)
+        
+        # The remaining stages share this detector's OpenCV objects
+        # (e.g. the enhancer's CLAHE), which are not thread-safe. These images
+        # are known cache misses, so the pipeline runs without another lookup
+        for index, image, text_regions in zip(pending, images, batch_text_regions):
+            result = self._run_pipeline(image, image_paths[index], text_regions=text_regions)
+            results[index] = result
+            
+            # Cache under the path-based hash that detect(path) looks up
+            if self.caching_enabled:
+                self.cache_manager.set(image_hashes[index], result)
+        
+        return results
+    
+    def _run_pipeline(self, image: np.ndarray,
+                      image_path: Optional[str] = None,
+                      quality_info: Optional[Dict[str, Any]] = None,
+                      enhanced: Optional[np.ndarray] = None,
+                      text_regions: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Run detection on a loaded image, without consulting or filling the cache.
+        
+        Args:
+            image: Input BGR image
+            image_path: Path the image was loaded from, recorded in the result
+            quality_info: Precomputed QualityAnalyzer.analyze() result for the image
+            enhanced: Precomputed ImageEnhancer.apply_adaptive_enhancement() result
+            text_regions: Precomputed OCRProcessor.extract_text() result for the image
+            
+        Returns:
+            Dictionary containing detected graph elements
+        """
+        # Start OCR first: it only needs the raw image and is the slowest stage
+        ocr_future = None
+        if self.ocr_enabled and text_regions is None:
+            print("Extracting text with OCR...")
+            ocr_future = self._ocr_pool.submit(self.ocr_processor.extract_text, image)
             
-        # Analyze image quality
-        quality_info = self.quality_analyzer.analyze(image)
+        # Analyze image quality unless the caller already did; the grayscale
+        # image is kept for the CPU preprocessing path
+        gray = None
+        if quality_info is None:
+            if len(image.shape) > 2 and image.shape[2] > 1:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            quality_info = self.quality_analyzer.analyze(image, gray=gray)
         print(f"Image quality: {quality_info['quality_level']} (score: {quality_info['quality_score']})")
         
         # Apply appropriate preprocessing based on quality
         if quality_info['quality_score'] < 2:  # Low or very low quality
             print("Applying adaptive enhancement for low quality image")
-            preprocessed = self.enhancer.apply_adaptive_enhancement(image)
+            if enhanced is not None:
+                preprocessed = enhanced
+            else:
+                preprocessed = self.enhancer.apply_adaptive_enhancement(image)
         else:
             # Standard preprocessing for higher quality images
-            preprocessed = self._preprocess(image)
+            preprocessed = self._preprocess(image, gray=gray)
             
         # Extract text if OCR is enabled
-        text_regions = []
-        if self.ocr_enabled:
-            print("Extracting text with OCR...")
-            text_regions = self.ocr_processor.extract_text(image)
+        if not self.ocr_enabled:
+            text_regions = []
+        else:
+            if ocr_future is not None:
+                text_regions = ocr_future.result()
             text_regions = self.ocr_processor.filter_text_by_size(
                 text_regions, 
                 min_confidence=self.config.get("min_text_confidence", 0.3)
             )
             print(f"Found {len(text_regions)} text regions")
         
-        # Detect nodes
-        nodes = self._detect_nodes(preprocessed)
+        # Detect nodes; edge detection works on the array form directly
+        nodes, node_array = self._detect_nodes(preprocessed)
         
         # Map text to nodes if available
         if self.ocr_enabled and text_regions:
             nodes = self.text_mapper.map_text_to_nodes(nodes, text_regions)
         
         # Detect edges
-        edges = self._detect_edges(preprocessed, nodes)
+        edges = self._detect_edges(preprocessed, node_array)
         
         # Map text to edges if available
         if self.ocr_enabled and text_regions:
@@ -123,17 +298,34 @@ class GraphDetector:
         
         if self.ocr_enabled:
             result["text_regions"] = text_regions
-        
-        # Cache result if enabled
-        if self.caching_enabled:
-            self.cache_manager.set(image_hash, result)
             
         return result
     
-    def _preprocess(self, image: np.ndarray) -> np.ndarray:
-        """Preprocess the image for better detection."""
+    def _preprocess(self, image: np.ndarray, gray: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Preprocess the image for better detection.
+        
+        Args:
+            image: Input BGR image
+            gray: Grayscale version of the image, if already computed
+            
+        Returns:
+            Binary image
+        """
+        if self._gpu_blur is not None:
+            return self._preprocess_gpu(image)
+        
+        # With an OpenCL device, UMat lets OpenCV's transparent API run the
+        # three steps on it and keep the intermediates in device memory
+        use_umat = cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL()
+        
         # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if gray is None:
+            if use_umat:
+                image = cv2.UMat(image)
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        elif use_umat:
+            gray = cv2.UMat(gray)
         
         # Apply Gaussian blur to reduce noise
         blurred = cv2.GaussianBlur(gray, (5, 5), 0)
@@ -142,49 +334,105 @@ class GraphDetector:
         _, binary = cv2.threshold(blurred, 0, 255, 
                                 cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
         
-        return binary
+        return binary.get() if use_umat else binary
+    
+    def _preprocess_gpu(self, image: np.ndarray) -> np.ndarray:
+        """
+        Run _preprocess on the GPU, keeping intermediate images in device memory.
+        
+        cv2.cuda.threshold has no Otsu mode, so the threshold is computed on
+        the host from a 256-bin histogram taken on the device.
+        """
+        stream = cv2.cuda_Stream()
+        gpu_image = cv2.cuda_GpuMat()
+        gpu_image.upload(image, stream)
+        
+        gray = cv2.cuda.cvtColor(gpu_image, cv2.COLOR_BGR2GRAY, stream=stream)
+        blurred = self._gpu_blur.apply(gray, stream=stream)
+        hist = cv2.cuda.calcHist(blurred, stream=stream).download(stream=stream)
+        stream.waitForCompletion()
+        
+        _, binary = cv2.cuda.threshold(
+            blurred, _otsu_threshold(hist), 255, cv2.THRESH_BINARY_INV, stream=stream
+        )
+        result = binary.download(stream=stream)
+        stream.waitForCompletion()
+        
+        return result
     
-    def _detect_nodes(self, preprocessed: np.ndarray) -> List[Dict]:
+    def _detect_nodes(self, preprocessed: np.ndarray) -> Tuple[List[Dict], np.ndarray]:
         """
         Detect nodes in the preprocessed image.
         
         This is a simplified implementation. In a real application,
         this would use more sophisticated computer vision techniques.
+        
+        Returns:
+            Tuple of the node dicts for the result and the same nodes
+            as a NODE_DTYPE array
+        """
+        node_array, contours = self._detect_node_array(preprocessed)
+        nodes = nodes_to_dicts(node_array)
+        
+        # Contour points are only kept on request: nothing downstream uses
+        # them, and they dominate the size of cached results
+        if self.config.get("keep_contours", False):
+            for node in nodes:
+                node["contour"] = contours[node["id"]].tolist()
+        
+        return nodes, node_array
+    
+    def _detect_node_array(self, preprocessed: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """
+        Detect nodes as a NODE_DTYPE structured array.
+        
+        Args:
+            preprocessed: Binary image
+            
+        Returns:
+            Tuple of the node array and all contours (indexed by node id)
         """
         # Find contours in the binary image
         contours, _ = cv2.findContours(
             preprocessed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
         )
         
-        nodes = []
-        for i, contour in enumerate(contours):
-            # Calculate centroid of the contour
-            M = cv2.moments(contour)
-            if M["m00"] != 0:
-                cX = int(M["m10"] / M["m00"])
-                cY = int(M["m01"] / M["m00"])
-                # DEBUG: print detected node position
-                print(f"DEBUG: _detect_nodes node position = ({cX}, {cY})")
-                # Create node representation
-                node = {
-                    "id": i,
-                    "position": (cX, cY),
-                    "contour": contour.tolist(),
-                    "area": cv2.contourArea(contour)
-                }
-                
-                # Filter small contours that might be noise
-                if node["area"] > 100:  # Minimum area threshold
-                    nodes.append(node)
-        
-        return nodes
+        # Filter small contours that might be noise before measuring the rest
+        areas = np.fromiter(
+            (cv2.contourArea(c) for c in contours), dtype=np.float64, count=len(contours)
+        )
+        ids = np.flatnonzero(areas > 100)  # Minimum area threshold
+        
+        # Calculate centroids of the remaining contours
+        moments = np.array(
+            [[M["m00"], M["m10"], M["m01"]] for M in map(cv2.moments, (contours[i] for i in ids))],
+            dtype=np.float64
+        ).reshape(-1, 3)
+        valid = moments[:, 0] != 0
+        ids, moments = ids[valid], moments[valid]
+        
+        nodes = np.empty(len(ids), dtype=NODE_DTYPE)
+        nodes["id"] = ids
+        nodes["x"] = np.trunc(moments[:, 1] / moments[:, 0])
+        nodes["y"] = np.trunc(moments[:, 2] / moments[:, 0])
+        nodes["area"] = areas[ids]
+        
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("_detect_nodes node positions = %s",
+                      list(zip(nodes["x"].tolist(), nodes["y"].tolist())))
+        
+        return nodes, contours
     
     def _detect_edges(self, preprocessed: np.ndarray, 
-                     nodes: List[Dict]) -> List[Dict]:
+                     nodes: np.ndarray) -> List[Dict]:
         """
         Detect edges between nodes in the preprocessed image.
         
         Simplified implementation for demonstration purposes.
+        
+        Args:
+            preprocessed: Binary image
+            nodes: Detected nodes as a NODE_DTYPE array
         """
         edges = []
         if len(nodes) <= 1:
@@ -192,27 +440,35 @@ class GraphDetector:
             
         # For simplicity, we'll connect nodes based on proximity
         # A more sophisticated approach would trace lines between nodes
-        for i in range(len(nodes)):
-            for j in range(i + 1, len(nodes)):
-                node1 = nodes[i]
-                node2 = nodes[j]
-                
-                # Calculate distance between nodes
-                pos1 = node1["position"]
-                pos2 = node2["position"]
-                print(f"DEBUG: _detect_edges pos1 type={type(pos1)}, value={pos1}; pos2 type={type(pos2)}, value={pos2}")
-                # ...existing code...
-                distance = np.sqrt((pos1[0] - pos2[0])**2 + 
-                                  (pos1[1] - pos2[1])**2)
-                
-                # Connect only if they are close enough
-                # This is a very naive approach
-                if distance < 200:  # Distance threshold
-                    edges.append({
-                        "id": len(edges),
-                        "source": node1["id"],
-                        "target": node2["id"],
-                        "weight": distance
-                    })
+        positions = np.column_stack((nodes["x"], nodes["y"])).astype(np.float64)
+        
+        # Connect only pairs that are close enough, found with a KD-tree
+        # radius query instead of comparing every pair of nodes
+        # This is a very naive approach
+        max_distance = self.config.get("edge_distance", 200)  # Distance threshold
+        pairs = cKDTree(positions).query_pairs(r=max_distance, output_type="ndarray")
+        
+        # query_pairs returns pairs (i < j) in no particular order
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        rows, cols = pairs[:, 0], pairs[:, 1]
+        distances = np.linalg.norm(positions[rows] - positions[cols], axis=1)
+        
+        # query_pairs also returns pairs exactly at max_distance; the
+        # threshold itself is exclusive
+        close = distances < max_distance
+        rows, cols, distances = rows[close], cols[close], distances[close]
+        node_ids = nodes["id"]
+        
+        edges = [
+            {
+                "id": k,
+                "source": source,
+                "target": target,
+                "weight": distance
+            }
+            for k, (source, target, distance) in enumerate(zip(
+                node_ids[rows].tolist(), node_ids[cols].tolist(), distances.tolist()
+            ))
+        ]
         
         return edges
@@ -46,34 +46,41 @@ class NodeDetector:
             binary, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE
         )
         
+        # Filter by area first, so the remaining measurements are only
+        # taken for contours that can become nodes
+        areas = np.fromiter(
+            (cv2.contourArea(c) for c in contours), dtype=np.float64, count=len(contours)
+        )
+        candidates = np.flatnonzero((areas > self.min_area) & (areas < self.max_area))
+        
+        # Calculate circularity for all candidates at once
+        perimeters = np.fromiter(
+            (cv2.arcLength(contours[i], True) for i in candidates),
+            dtype=np.float64, count=len(candidates)
+        )
+        circularities = np.zeros_like(perimeters)
+        np.divide(4 * np.pi * areas[candidates], perimeters * perimeters,
+                  out=circularities, where=perimeters > 0)
+        
         nodes = []
-        for i, contour in enumerate(contours):
-            area = cv2.contourArea(contour)
+        for i, area, circularity in zip(candidates, areas[candidates], circularities):
+            contour = contours[i]
             
-            # Filter by area
-            if self.min_area < area < self.max_area:
-                # Calculate circularity
-                perimeter = cv2.arcLength(contour, True)
-                if perimeter > 0:
-                    circularity = 4 * np.pi * area / (perimeter * perimeter)
-                else:
-                    circularity = 0
+            # Calculate centroid
+            M = cv2.moments(contour)
+            if M["m00"] != 0:
+                cX = int(M["m10"] / M["m00"])
+                cY = int(M["m01"] / M["m00"])
                 
-                # Calculate centroid
-                M = cv2.moments(contour)
-                if M["m00"] != 0:
-                    cX = int(M["m10"] / M["m00"])
-                    cY = int(M["m01"] / M["m00"])
-                    
-                    # Create node object
-                    node = {
-                        "id": i,
-                        "position": (cX, cY),
-                        "area": area,
-                        "circularity": circularity,
-                        "bounding_box": cv2.boundingRect(contour),
-                        "is_likely_node": circularity > self.circularity_threshold
-                    }
-                    nodes.append(node)
+                # Create node object
+                node = {
+                    "id": int(i),
+                    "position": (cX, cY),
+                    "area": float(area),
+                    "circularity": float(circularity),
+                    "bounding_box": cv2.boundingRect(contour),
+                    "is_likely_node": bool(circularity > self.circularity_threshold)
+                }
+                nodes.append(node)
         
         return nodes
@@ -1,7 +1,11 @@
-import networkx as nx
-from typing import Dict, Any
+from typing import Dict, Any, TYPE_CHECKING
 import copy
 
+# networkx is imported lazily by the methods that need it, so importing
+# this module (e.g. alongside GraphDetector) does not pay for it
+if TYPE_CHECKING:
+    import networkx as nx
+
 class NetworkXBuilder:
     """
     Class for building NetworkX graph objects from detected nodes and edges.
@@ -9,9 +13,10 @@ class NetworkXBuilder:
     
     def __init__(self):
         """Initialize the NetworkX graph builder."""
-        pass
+        # Figure reused by visualize_graph(reuse_figure=True)
+        self._figure = None
     
-    def build_graph(self, detection_result: Dict[str, Any]) -> nx.Graph:
+    def build_graph(self, detection_result: Dict[str, Any]) -> "nx.Graph":
         """
         Build a NetworkX graph from detector output.
         
@@ -21,6 +26,8 @@ class NetworkXBuilder:
         Returns:
             NetworkX graph object
         """
+        import networkx as nx
+        
         # Create a new undirected graph
         G = nx.Graph()
         for node in detection_result.get("nodes", []):
@@ -52,31 +59,69 @@ class NetworkXBuilder:
             )
         return G
 
-    def save_graph(self, graph: nx.Graph, output_path: str, format: str = "gexf") -> None:
+    def save_graph(self, graph: "nx.Graph", output_path: str, format: str = "gexf") -> None:
         """
         Save the graph to a file.
         Converts all tuple attributes to list for serialization.
+        
+        The conversion is done in place on the caller's graph instead of on a
+        copy, and the original tuples are restored once the file is written.
         """
-        graph_to_save = graph.copy()
-        for n, attrs in graph_to_save.nodes(data=True):
-            for k, v in list(attrs.items()):
+        # (attribute dict, key, original tuple) for every converted value
+        changed = []
+        for n, attrs in graph.nodes(data=True):
+            for k, v in attrs.items():
                 if isinstance(v, tuple):
-                    attrs[k] = list(v)
-        for u, v, attrs in graph_to_save.edges(data=True):
-            for k, val in list(attrs.items()):
+                    changed.append((attrs, k, v))
+        for u, v, attrs in graph.edges(data=True):
+            for k, val in attrs.items():
                 if isinstance(val, tuple):
-                    attrs[k] = list(val)
+                    changed.append((attrs, k, val))
+        
+        try:
+            for attrs, k, value in changed:
+                attrs[k] = list(value)
+            self._write_graph(graph, output_path, format)
+        finally:
+            for attrs, k, value in changed:
+                attrs[k] = value
+
+    def save_detection(self, detection_result: Dict[str, Any], output_path: str,
+                       format: str = "gexf") -> None:
+        """
+        Build a graph from detector output and save it directly to a file.
+        
+        Use this instead of build_graph() + save_graph() when the graph object
+        itself is not needed: the freshly built graph is private, so its
+        attributes are made serializable in place instead of on a copy.
+        
+        Args:
+            detection_result: Dictionary containing nodes and edges
+            output_path: Path to save the graph
+            format: Output format (gexf, graphml, gml)
+        """
+        graph = self.build_graph(detection_result)
+        # build_graph already converts tuples to lists, except for 'pos'
+        for n, attrs in graph.nodes(data=True):
+            if isinstance(attrs.get("pos"), tuple):
+                attrs["pos"] = list(attrs["pos"])
+        self._write_graph(graph, output_path, format)
+
+    def _write_graph(self, graph: "nx.Graph", output_path: str, format: str) -> None:
+        """Write a serializable graph in the given format."""
+        import networkx as nx
+        
         if format == "gexf":
-            nx.write_gexf(graph_to_save, output_path)
+            nx.write_gexf(graph, output_path)
         elif format == "graphml":
-            nx.write_graphml(graph_to_save, output_path)
+            nx.write_graphml(graph, output_path)
         elif format == "gml":
-            nx.write_gml(graph_to_save, output_path)
+            nx.write_gml(graph, output_path)
         else:
             raise ValueError(f"Unsupported format: {format}")
     
-    def visualize_graph(self, graph: nx.Graph, output_path: str = None, 
-                       with_labels: bool = True) -> None:
+    def visualize_graph(self, graph: "nx.Graph", output_path: str = None, 
+                       with_labels: bool = True, reuse_figure: bool = False) -> None:
         """
         Visualize the graph.
         
@@ -84,21 +129,33 @@ class NetworkXBuilder:
             graph: NetworkX graph object
             output_path: Path to save the visualization
             with_labels: Whether to show node labels
+            reuse_figure: Draw on a figure kept by this builder instead of
+                creating a new one; useful when rendering many graphs in a loop
         """
         import matplotlib.pyplot as plt
+        import networkx as nx
         
         # Get node positions if available
         pos = nx.get_node_attributes(graph, 'pos')
         if not pos:  # If positions not available, use spring layout
             pos = nx.spring_layout(graph)
         
-        plt.figure(figsize=(12, 10))
+        if reuse_figure:
+            if self._figure is None:
+                self._figure = plt.figure(figsize=(12, 10))
+            else:
+                self._figure.clf()
+            figure = self._figure
+        else:
+            figure = plt.figure(figsize=(12, 10))
+        
         nx.draw(
-            graph, pos, with_labels=with_labels, 
+            graph, pos, ax=figure.gca(), with_labels=with_labels, 
             node_size=500, node_color="lightblue", 
             font_size=10, edge_color="gray"
         )
         
         if output_path:
-            plt.savefig(output_path)
-        plt.show()
+            figure.savefig(output_path)
+        if not reuse_figure:
+            plt.show()
@@ -1,6 +1,6 @@
 import cv2
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 
 class NoiseReducer:
     """Class for reducing noise in graph images."""
@@ -17,6 +17,12 @@ class NoiseReducer:
         self.median_kernel = self.config.get("median_kernel", 3)
         self.gaussian_kernel = self.config.get("gaussian_kernel", (5, 5))
         self.gaussian_sigma = self.config.get("gaussian_sigma", 0)
+        # NLM cost grows with the square of the search window; 11 compares
+        # 121 patches per pixel instead of 441 for OpenCV's usual 21
+        self.search_window = self.config.get("search_window", 11)
+        # Median + Gaussian pre-pass before grayscale NLM; NLM removes that
+        # noise on its own, so the pre-pass is off unless requested
+        self.prefilter = self.config.get("prefilter", False)
         
     def reduce_noise(self, image: np.ndarray) -> np.ndarray:
         """
@@ -25,6 +31,30 @@ class NoiseReducer:
         Args:
             image: Input image
             
+        Returns:
+            Denoised image
+        """
+        return self._reduce_noise(
+            image,
+            self.median_kernel,
+            self.gaussian_kernel,
+            self.gaussian_sigma,
+            self.denoise_strength
+        )
+    
+    def _reduce_noise(self, image: np.ndarray, median_kernel: int,
+                      gaussian_kernel: Tuple[int, int], gaussian_sigma: float,
+                      denoise_strength: float) -> np.ndarray:
+        """
+        Apply noise reduction with explicit filter parameters.
+        
+        Args:
+            image: Input image
+            median_kernel: Median filter aperture for the grayscale pre-pass
+            gaussian_kernel: Gaussian kernel size for the grayscale pre-pass
+            gaussian_sigma: Gaussian sigma for the grayscale pre-pass
+            denoise_strength: Non-local Means filter strength
+            
         Returns:
             Denoised image
         """
@@ -32,46 +62,42 @@ class NoiseReducer:
         if image is None:
             raise ValueError("Input image is None")
             
-        # Convert to grayscale if needed
+        # If original was color, denoise only its luminance; graph structure
+        # lives in the L channel, so the second NLM pass that
+        # fastNlMeansDenoisingColored runs on the chroma channels is skipped
         if len(image.shape) > 2 and image.shape[2] > 1:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            is_color = True
-        else:
-            gray = image.copy()
-            is_color = False
-            
-        # Apply median filter to remove salt-and-pepper noise
-        median = cv2.medianBlur(gray, self.median_kernel)
-        
-        # Apply Gaussian blur to reduce high-frequency noise
-        gaussian = cv2.GaussianBlur(
-            median, 
-            self.gaussian_kernel,
-            self.gaussian_sigma
-        )
-        
-        # If original was color, we need to denoise color image
-        if is_color:
-            # Apply Non-local Means Denoising on the color image
-            denoised = cv2.fastNlMeansDenoisingColored(
-                image,
+            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+            l, a, b = cv2.split(lab)
+            l = cv2.fastNlMeansDenoising(
+                l,
                 None,
-                h=self.denoise_strength,
-                hColor=self.denoise_strength,
+                h=denoise_strength,
                 templateWindowSize=7,
-                searchWindowSize=21
+                searchWindowSize=self.search_window
             )
-            return denoised
-        else:
-            # Apply Non-local Means Denoising on grayscale
-            denoised = cv2.fastNlMeansDenoising(
-                gaussian,
-                None,
-                h=self.denoise_strength,
-                templateWindowSize=7,
-                searchWindowSize=21
+            return cv2.cvtColor(cv2.merge([l, a, b]), cv2.COLOR_LAB2BGR)
+        
+        gray = image
+        if self.prefilter:
+            # Apply median filter to remove salt-and-pepper noise
+            median = cv2.medianBlur(gray, median_kernel)
+            
+            # Apply Gaussian blur to reduce high-frequency noise
+            gray = cv2.GaussianBlur(
+                median, 
+                gaussian_kernel,
+                gaussian_sigma
             )
-            return denoised
+        
+        # Apply Non-local Means Denoising on grayscale
+        denoised = cv2.fastNlMeansDenoising(
+            gray,
+            None,
+            h=denoise_strength,
+            templateWindowSize=7,
+            searchWindowSize=self.search_window
+        )
+        return denoised
     
     def apply_adaptive_denoising(self, image: np.ndarray, 
                                noise_level: float = None) -> np.ndarray:
@@ -109,36 +135,13 @@ class NoiseReducer:
     def reduce_noise_light(self, image: np.ndarray) -> np.ndarray:
         """Light denoising for images with low noise."""
         # Use smaller kernel size and strength for subtle denoising
-        temp_median_kernel = self.median_kernel
-        temp_denoise_strength = self.denoise_strength
-        
-        self.median_kernel = 3
-        self.denoise_strength = 5
-        
-        result = self.reduce_noise(image)
-        
-        # Restore original parameters
-        self.median_kernel = temp_median_kernel
-        self.denoise_strength = temp_denoise_strength
-        
-        return result
+        return self._reduce_noise(
+            image, 3, self.gaussian_kernel, self.gaussian_sigma, 5
+        )
     
     def reduce_noise_aggressive(self, image: np.ndarray) -> np.ndarray:
         """Aggressive denoising for images with heavy noise."""
         # Use larger kernel size and strength for heavy denoising
-        temp_median_kernel = self.median_kernel
-        temp_denoise_strength = self.denoise_strength
-        temp_gaussian_kernel = self.gaussian_kernel
-        
-        self.median_kernel = 5
-        self.denoise_strength = 15
-        self.gaussian_kernel = (7, 7)
-        
-        result = self.reduce_noise(image)
-        
-        # Restore original parameters
-        self.median_kernel = temp_median_kernel
-        self.denoise_strength = temp_denoise_strength
-        self.gaussian_kernel = temp_gaussian_kernel
-        
-        return result
+        return self._reduce_noise(
+            image, 5, (7, 7), self.gaussian_sigma, 15
+        )
@@ -1,6 +1,10 @@
+import logging
+import math
 import numpy as np
 from typing import Dict, List, Any, Tuple
 
+log = logging.getLogger(__name__)
+
 class TextMapper:
     """Class for mapping recognized text to graph elements."""
     
@@ -26,40 +30,26 @@ class TextMapper:
         Returns:
             Nodes with mapped text labels
         """
+        # Find the closest text region for all nodes at once
+        positions = np.asarray(
+            [self._valid_position(node["position"]) for node in nodes], dtype=np.float64
+        ).reshape(-1, 2)
+        closest, min_dist_sq = self._closest_texts(positions, text_regions)
+        
         # Create a copy of nodes to add text attributes
         labeled_nodes = []
         
-        for node in nodes:
+        for node, text_index, dist_sq in zip(nodes, closest.tolist(), min_dist_sq.tolist()):
             node_copy = node.copy()
-            node_position = node["position"]
-            print(f"DEBUG: text_mapper node['position'] type={type(node_position)}, value={node_position}")
-            # Ensure node_position is valid
-            if not (isinstance(node_position, (list, tuple)) and len(node_position) == 2):
-                node_position = (0, 0)
-            closest_text = None
-            min_distance = float('inf')
-            
-            # Find closest text region
-            for text_region in text_regions:
-                text_centroid = text_region["centroid"]
-                
-                # Calculate distance
-                distance = np.sqrt(
-                    (node_position[0] - text_centroid[0])**2 + 
-                    (node_position[1] - text_centroid[1])**2
-                )
-                
-                # Update closest text if this one is closer
-                if distance < min_distance and distance < self.proximity_threshold:
-                    min_distance = distance
-                    closest_text = text_region
+            log.debug("text_mapper node position = %r", node["position"])
             
             # Add label information if found
-            if closest_text:
+            if text_index >= 0:
+                closest_text = text_regions[text_index]
                 node_copy["label"] = closest_text["text"]
                 node_copy["label_confidence"] = closest_text["confidence"]
                 node_copy["label_id"] = closest_text["id"]
-                node_copy["label_distance"] = min_distance
+                node_copy["label_distance"] = math.sqrt(dist_sq)
             else:
                 node_copy["label"] = ""
                 
@@ -67,6 +57,43 @@ class TextMapper:
             
         return labeled_nodes
     
+    def _closest_texts(self, points: np.ndarray,
+                       text_regions: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the closest text region within the proximity threshold for each point.
+        
+        Args:
+            points: (N, 2) array of positions
+            text_regions: List of detected text regions
+            
+        Returns:
+            Index of the closest text region per point (-1 if none is close
+            enough) and the corresponding squared distance
+        """
+        centroids = np.asarray(
+            [text_region["centroid"] for text_region in text_regions], dtype=np.float64
+        ).reshape(-1, 2)
+        if len(points) == 0 or len(centroids) == 0:
+            return np.full(len(points), -1), np.full(len(points), np.inf)
+        
+        # Squared distances between every point and every text centroid;
+        # comparing against the squared threshold avoids the square roots
+        diff = points[:, None, :] - centroids[None, :, :]
+        dist_sq = np.einsum("ijk,ijk->ij", diff, diff)
+        dist_sq[dist_sq >= self.proximity_threshold ** 2] = np.inf
+        
+        closest = dist_sq.argmin(axis=1)
+        min_dist_sq = dist_sq[np.arange(len(points)), closest]
+        closest[np.isinf(min_dist_sq)] = -1
+        return closest, min_dist_sq
+    
+    @staticmethod
+    def _valid_position(position: Any) -> Tuple[float, float]:
+        """Return the position, or (0, 0) if it is malformed."""
+        if not (isinstance(position, (list, tuple)) and len(position) == 2):
+            return (0, 0)
+        return position
+    
     def map_text_to_edges(self, 
                           edges: List[Dict[str, Any]], 
                           text_regions: List[Dict[str, Any]],
@@ -85,60 +112,44 @@ class TextMapper:
         # Create a dictionary for quick node lookup
         node_dict = {node["id"]: node for node in nodes}
         
-        # Create a copy of edges to add text attributes
-        labeled_edges = []
-        
-        for edge in edges:
-            edge_copy = edge.copy()
-            
-            # Get source and target nodes
+        # Calculate midpoints of all edges whose nodes are known
+        midpoints = {}
+        for index, edge in enumerate(edges):
             source_node = node_dict.get(edge["source"])
             target_node = node_dict.get(edge["target"])
-            
             if source_node and target_node:
-                # DEBUG: print type and value of source_pos and target_pos
-                print(f"DEBUG: text_mapper source_pos type={type(source_node['position'])}, value={source_node['position']}")
-                print(f"DEBUG: text_mapper target_pos type={type(target_node['position'])}, value={target_node['position']}")
-                # Calculate midpoint of the edge
-                source_pos = source_node["position"]
-                target_pos = target_node["position"]
-                # Ensure both are valid (list/tuple of length 2)
-                if not (isinstance(source_pos, (list, tuple)) and len(source_pos) == 2):
-                    source_pos = (0, 0)
-                if not (isinstance(target_pos, (list, tuple)) and len(target_pos) == 2):
-                    target_pos = (0, 0)
-                midpoint = (
+                log.debug("text_mapper edge %r positions = %r -> %r", edge.get("id"),
+                          source_node["position"], target_node["position"])
+                source_pos = self._valid_position(source_node["position"])
+                target_pos = self._valid_position(target_node["position"])
+                midpoints[index] = (
                     (source_pos[0] + target_pos[0]) // 2,
                     (source_pos[1] + target_pos[1]) // 2
                 )
-                
-                closest_text = None
-                min_distance = float('inf')
-                
-                # Find closest text region to the midpoint
-                for text_region in text_regions:
-                    text_centroid = text_region["centroid"]
-                    
-                    # Calculate distance
-                    distance = np.sqrt(
-                        (midpoint[0] - text_centroid[0])**2 + 
-                        (midpoint[1] - text_centroid[1])**2
-                    )
-                    
-                    # Update closest text if this one is closer
-                    if distance < min_distance and distance < self.proximity_threshold:
-                        min_distance = distance
-                        closest_text = text_region
-                
+        
+        # Find the closest text region to every midpoint at once
+        points = np.asarray(list(midpoints.values()), dtype=np.float64).reshape(-1, 2)
+        closest, min_dist_sq = self._closest_texts(points, text_regions)
+        matches = dict(zip(midpoints, zip(closest.tolist(), min_dist_sq.tolist())))
+        
+        # Create a copy of edges to add text attributes
+        labeled_edges = []
+        
+        for index, edge in enumerate(edges):
+            edge_copy = edge.copy()
+            
+            if index in midpoints:
                 # Add midpoint to edge data
-                edge_copy["midpoint"] = midpoint
+                edge_copy["midpoint"] = midpoints[index]
                 
                 # Add label information if found
-                if closest_text:
+                text_index, dist_sq = matches[index]
+                if text_index >= 0:
+                    closest_text = text_regions[text_index]
                     edge_copy["label"] = closest_text["text"]
                     edge_copy["label_confidence"] = closest_text["confidence"]
                     edge_copy["label_id"] = closest_text["id"]
-                    edge_copy["label_distance"] = min_distance
+                    edge_copy["label_distance"] = math.sqrt(dist_sq)
                 else:
                     edge_copy["label"] = ""
             
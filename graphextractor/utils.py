@@ -0,0 +1,11 @@
+"""
+Helpers shared by the detection and preprocessing modules.
+"""
+import cv2
+
+def cuda_available() -> bool:
+    """Check whether OpenCV was built with CUDA and a device is present."""
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
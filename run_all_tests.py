@@ -14,12 +14,12 @@ def run_command(command, description):
     print(f"Запуск: {description}")
     print(f"{'-'*60}\n")
     
-    start_time = time.time()
+    start_time = time.perf_counter_ns()
     result = subprocess.run(command, shell=True)
-    end_time = time.time()
+    end_time = time.perf_counter_ns()
     
     if result.returncode == 0:
-        print(f"\n✅ {description} выполнено успешно за {end_time - start_time:.2f} секунд\n")
+        print(f"\n✅ {description} выполнено успешно за {(end_time - start_time) / 1e9:.2f} секунд\n")
         return True
     else:
         print(f"\n❌ {description} завершилось с ошибкой (код: {result.returncode})\n")
@@ -6,13 +6,15 @@ setup(
     packages=find_packages(),
     install_requires=[
         "numpy>=1.19.0",
-        "opencv-python>=4.5.0",
+        "opencv-python-headless>=4.5.0",
         "networkx>=2.6.0",
         "scikit-image>=0.18.0",
+        "scipy>=1.6.0",
         "matplotlib>=3.4.0",
         "torch>=1.9.0",
         "fastapi>=0.68.0",
-        "uvicorn>=0.15.0",
+        "uvicorn[standard]>=0.15.0",
+        "aiofiles>=0.8.0",
         "pillow>=8.2.0",
         # Новые зависимости
         "easyocr>=1.6.0",  # для OCR
@@ -20,8 +22,16 @@ setup(
         "torchvision>=0.10.0",  # для моделей нейронных сетей
         "scikit-learn>=1.0.0",  # для ML алгоритмов
         "albumentations>=1.1.0",  # для аугментаций и предобработки
-        "imagehash>=4.2.0",  # для хеширования изображений
+        "orjson>=3.6.0",    # быстрая сериализация JSON (кэш, ответы API)
+        "msgpack>=1.0.0",   # сериализация результатов в Redis
     ],
+    extras_require={
+        # Скрипты тестирования API и визуализации результатов
+        "test": [
+            "aiohttp>=3.8.0",
+            "ijson>=3.1.0",
+        ],
+    },
     author="GraphExtractor Team",
     description="A service for detecting and extracting graph structures from images",
     python_requires=">=3.8",
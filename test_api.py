@@ -3,159 +3,323 @@
 """
 
 import os
-import glob
 import json
 import time
-import requests
-import subprocess
-import signal
+import asyncio
+import hashlib
+import contextlib
+import threading
+import aiohttp
+import uvicorn
 from pathlib import Path
 
-def test_api():
-    """Тестирует API сервер GraphExtractor."""
-    
-    api_url = "http://localhost:8000"
-    results_dir = "test_results/api_test"
-    os.makedirs(results_dir, exist_ok=True)
-    
-    # Получаем список всех изображений для тестирования
-    image_files = glob.glob("test_images/*.png") + \
-                 glob.glob("test_images/*.jpg") + \
-                 glob.glob("test_images/*.jpeg")
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import aiofiles
+    AIOFILES_AVAILABLE = True
+except ImportError:
+    AIOFILES_AVAILABLE = False
+
+# Расширения файлов тестовых изображений
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+
+# Максимальное число изображений, обрабатываемых сервером одновременно
+CONCURRENCY = 8
+
+# Параметры запроса распознавания
+REQUEST_DATA = {
+    "output_format": "gexf",
+    "visualize": "true",
+    "enable_ocr": "true",
+    "enable_cache": "true",
+    "enhance_image": "true"
+}
+
+# Число изображений в одном запросе /extract_graph_batch/
+BATCH_SIZE = 8
+
+# Размер части при скачивании файлов результатов
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Максимальное время ожидания запуска API сервера, сек
+STARTUP_TIMEOUT = 30
+
+# Время ожидания каждого шага остановки API сервера, сек
+SHUTDOWN_TIMEOUT = 3
+
+def _loads_json(data):
+    """Разбирает JSON из байтов (через orjson, если он установлен)."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dumps_json(data):
+    """Сериализует данные в JSON с отступами (через orjson, если он установлен)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode("utf-8")
+
+def _file_digest(path):
+    """Возвращает хэш содержимого файла."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+async def _write_file(path, data):
+    """Асинхронно записывает байты в файл."""
+    if AIOFILES_AVAILABLE:
+        async with aiofiles.open(path, "wb") as f:
+            await f.write(data)
+    else:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, Path(path).write_bytes, data)
+
+async def _download(session, url, path):
+    """Скачивает файл по частям прямо на диск, не держа его целиком в памяти и не блокируя цикл событий."""
+    async with session.get(url) as response:
+        if response.status != 200:
+            return False
+        if AIOFILES_AVAILABLE:
+            async with aiofiles.open(path, "wb") as f:
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    await f.write(chunk)
+        else:
+            loop = asyncio.get_running_loop()
+            with open(path, "wb") as f:
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    await loop.run_in_executor(None, f.write, chunk)
+    return True
+
+async def _post_batch(session, api_url, image_paths, data):
+    """Отправляет изображения одним запросом /extract_graph_batch/, возвращает код, тело и время запроса."""
+    with contextlib.ExitStack() as stack:
+        form = aiohttp.FormData(data)
+        for image_path in image_paths:
+            img_file = stack.enter_context(open(image_path, "rb"))
+            form.add_field("files", img_file, filename=os.path.basename(image_path),
+                           content_type="image/png")
+        
+        start_time = time.perf_counter_ns()
+        async with session.post(f"{api_url}/extract_graph_batch/", data=form) as response:
+            response_body = await response.read()
+            status_code = response.status
+        elapsed = (time.perf_counter_ns() - start_time) / 1e9
+    return status_code, response_body, elapsed
+
+async def _process_batch(session, sem, api_url, image_paths, results_dir):
+    """
+    Тестирует пакет изображений: распознавание, загрузка результатов и проверка кэширования.
     
-    if not image_files:
-        print("Ошибка: Изображения для тестирования не найдены")
-        return False
+    Время запроса пакета делится поровну между его изображениями.
+    """
+    image_names = [os.path.basename(image_path) for image_path in image_paths]
+    data = REQUEST_DATA
     
-    # Запускаем API сервер
-    print("Запуск API сервера...")
-    try:
-        server_process = subprocess.Popen(
-            ["python", "-m", "graphextractor.api.app"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
+    async with sem:
+        print(f"Тестирование изображений: {', '.join(image_names)}")
         
-        # Даем серверу время на запуск
-        time.sleep(5)
-        
-        # Проверяем, что сервер запущен
         try:
-            response = requests.get(f"{api_url}/docs")
-            if response.status_code != 200:
-                print(f"Ошибка: API сервер не отвечает. Код: {response.status_code}")
-                server_process.kill()
-                return False
-        except requests.exceptions.ConnectionError:
-            print("Ошибка: Не удалось подключиться к API серверу")
-            server_process.kill()
-            return False
+            # 1. Распознавание графов
+            status_code, response_body, batch_time = await _post_batch(
+                session, api_url, image_paths, data
+            )
             
-        print("API сервер успешно запущен")
-        
-        # Тестируем каждое изображение
-        results = []
-        
-        for image_path in image_files:
-            image_name = Path(image_path).name
-            print(f"Тестирование изображения: {image_name}")
+            if status_code != 200:
+                response_text = response_body.decode("utf-8", errors="replace")
+                print(f"Ошибка при обработке {', '.join(image_names)}: {response_text}")
+                return [{
+                    "image_name": image_name,
+                    "status": "error",
+                    "status_code": status_code,
+                    "error": response_text
+                } for image_name in image_names]
+            
+            batch_results = _loads_json(response_body)
+            
+            # 2. Загрузка результатов и визуализаций, если доступны. Файлы нужны только
+            # для сохранения, а не для замеров, поэтому загрузка идет одновременно
+            # с повторным запросом
+            downloads = []
+            for result in batch_results:
+                if "error" in result:
+                    continue
+                for key in ("graph_file", "visualization_file"):
+                    if key in result:
+                        filename = os.path.basename(result[key])
+                        downloads.append(_download(session, f"{api_url}/download/{filename}",
+                                                   os.path.join(results_dir, filename)))
+            
+            # 3. Повторный запрос для проверки кэширования
+            print(f"  [{', '.join(image_names)}] Тестирование кэширования...")
+            (_, _, batch_time_cached), _ = await asyncio.gather(
+                _post_batch(session, api_url, image_paths, data),
+                asyncio.gather(*downloads)
+            )
             
-            try:
-                # 1. Распознавание графа
-                with open(image_path, "rb") as img_file:
-                    files = {"file": (image_name, img_file, "image/png")}
-                    data = {
-                        "output_format": "gexf",
-                        "visualize": "true",
-                        "enable_ocr": "true",
-                        "enable_cache": "true",
-                        "enhance_image": "true"
-                    }
-                    
-                    start_time = time.time()
-                    response = requests.post(
-                        f"{api_url}/extract_graph/",
-                        files=files,
-                        data=data
-                    )
-                    process_time = time.time() - start_time
-                    
-                if response.status_code != 200:
-                    print(f"Ошибка при обработке {image_name}: {response.text}")
+            process_time = batch_time / len(image_paths)
+            process_time_cached = batch_time_cached / len(image_paths)
+            
+            # 4. Запись результатов
+            results = []
+            for image_name, result in zip(image_names, batch_results):
+                if "error" in result:
+                    print(f"  Ошибка при обработке {image_name}: {result['error']}")
                     results.append({
                         "image_name": image_name,
                         "status": "error",
-                        "status_code": response.status_code,
-                        "error": response.text
+                        "error": result["error"]
                     })
                     continue
                 
-                result = response.json()
-                
-                # 2. Загрузка результатов
                 graph_filename = os.path.basename(result["graph_file"])
-                graph_response = requests.get(f"{api_url}/download/{graph_filename}")
-                
-                if graph_response.status_code == 200:
-                    with open(os.path.join(results_dir, graph_filename), "wb") as f:
-                        f.write(graph_response.content)
-                
-                # 3. Загрузка визуализации, если доступна
-                vis_filename = ""
-                if "visualization_file" in result:
-                    vis_filename = os.path.basename(result["visualization_file"])
-                    vis_response = requests.get(f"{api_url}/download/{vis_filename}")
-                    
-                    if vis_response.status_code == 200:
-                        with open(os.path.join(results_dir, vis_filename), "wb") as f:
-                            f.write(vis_response.content)
-                
-                # 4. Повторный запрос для проверки кэширования
-                print("  Тестирование кэширования...")
+                vis_filename = os.path.basename(result.get("visualization_file", ""))
                 
-                with open(image_path, "rb") as img_file:
-                    files = {"file": (image_name, img_file, "image/png")}
-                    
-                    start_time_cached = time.time()
-                    response_cached = requests.post(
-                        f"{api_url}/extract_graph/",
-                        files=files,
-                        data=data
-                    )
-                    process_time_cached = time.time() - start_time_cached
+                print(f"  [{image_name}] Узлов: {result['nodes_count']}, Рёбер: {result['edges_count']}")
                 
-                # 5. Запись результатов
                 results.append({
                     "image_name": image_name,
                     "status": "success",
                     "nodes_count": result["nodes_count"],
                     "edges_count": result["edges_count"],
+                    "batch_size": len(image_paths),
                     "first_request_time": process_time,
                     "cached_request_time": process_time_cached,
-                    "cache_speedup": process_time / max(process_time_cached, 0.001),
+                    "cache_speedup": process_time / max(process_time_cached, 1e-9),
                     "graph_file": os.path.join(results_dir, graph_filename),
                     "visualization_file": os.path.join(results_dir, vis_filename) if vis_filename else None
                 })
-                
-                print(f"  Узлов: {result['nodes_count']}, Рёбер: {result['edges_count']}")
-                print(f"  Время обработки: {process_time:.2f} сек")
-                print(f"  Время с кэшированием: {process_time_cached:.2f} сек")
-                print(f"  Ускорение: {process_time / max(process_time_cached, 0.001):.1f}x")
-                
-            except Exception as e:
-                print(f"  Ошибка при тестировании {image_name}: {str(e)}")
-                results.append({
-                    "image_name": image_name,
-                    "status": "error",
-                    "error": str(e)
-                })
+            
+            print(f"  [{', '.join(image_names)}] Время обработки: {process_time:.2f} сек на изображение")
+            print(f"  [{', '.join(image_names)}] Время с кэшированием: {process_time_cached:.2f} сек на изображение")
+            print(f"  [{', '.join(image_names)}] Ускорение: {process_time / max(process_time_cached, 1e-9):.1f}x")
+            
+            return results
+        
+        except Exception as e:
+            print(f"  Ошибка при тестировании {', '.join(image_names)}: {str(e)}")
+            return [{
+                "image_name": image_name,
+                "status": "error",
+                "error": str(e)
+            } for image_name in image_names]
+
+async def _wait_for_server(server, server_thread):
+    """Ждет запуска сервера, пока он не запустится или не истечет STARTUP_TIMEOUT."""
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.started:
+            return True
+        if not server_thread.is_alive():
+            print("Ошибка: API сервер завершился при запуске")
+            return False
+        await asyncio.sleep(0.05)
+    
+    print(f"Ошибка: API сервер не запустился за {STARTUP_TIMEOUT} сек")
+    return False
+
+async def test_api():
+    """Тестирует API сервер GraphExtractor."""
+    
+    api_url = "http://127.0.0.1:8000"
+    results_dir = "test_results/api_test"
+    os.makedirs(results_dir, exist_ok=True)
+    
+    # Получаем список всех изображений для тестирования за один проход по директории
+    image_files = []
+    if os.path.isdir("test_images"):
+        with os.scandir("test_images") as entries:
+            image_files = [
+                entry.path for entry in entries
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+            ]
+    
+    if not image_files:
+        print("Ошибка: Изображения для тестирования не найдены")
+        return False
+    
+    # Запускаем API сервер в этом же процессе, в отдельном потоке со своим циклом событий:
+    # без запуска нового интерпретатора и остановки через сигналы.
+    # httptools (входит в uvicorn[standard]) ускоряет разбор HTTP. Цикл событий сервера -
+    # стандартный asyncio: uvloop устанавливает политику циклов событий на весь процесс,
+    # а делать это из неосновного потока нельзя.
+    # Рабочий процесс uvicorn один: распознавание и так выполняется в пуле процессов
+    # приложения размером в число ядер, а каждый дополнительный рабочий процесс
+    # создавал бы собственный такой пул
+    print("Запуск API сервера...")
+    server = uvicorn.Server(uvicorn.Config(
+        "graphextractor.api.app:app",
+        host="127.0.0.1",
+        port=8000,
+        loop="asyncio",
+        http="httptools",
+        log_level="warning"
+    ))
+    server_thread = threading.Thread(target=server.run, daemon=True)
+    try:
+        server_thread.start()
+        
+        # Ждем готовности сервера вместо фиксированной паузы
+        if not await _wait_for_server(server, server_thread):
+            return False
+        
+        print("API сервер успешно запущен")
+        
+        # Одна сессия на весь тест: пул из CONCURRENCY соединений держит сокеты
+        # открытыми (keep-alive) между запросами вместо нового подключения на каждый
+        connector = aiohttp.TCPConnector(limit=CONCURRENCY)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            # Прогрев: первые запросы к каждому процессу-обработчику загружают модели
+            # и библиотеки, поэтому один пакет без кэширования отправляется до замеров
+            # и его время не учитывается
+            print("Прогрев API сервера...")
+            await _post_batch(session, api_url, [image_files[0]] * BATCH_SIZE,
+                              dict(REQUEST_DATA, enable_cache="false"))
+            
+            # Изображения с одинаковым содержимым отправляем на сервер один раз
+            first_by_digest = {}
+            first_of = {}
+            for image_path in image_files:
+                first_of[image_path] = first_by_digest.setdefault(_file_digest(image_path), image_path)
+            unique_files = list(first_by_digest.values())
+            
+            # Отправляем изображения пакетами по BATCH_SIZE; пакеты обрабатываются
+            # параллельно, но не более CONCURRENCY изображений одновременно
+            batches = [unique_files[i:i + BATCH_SIZE]
+                       for i in range(0, len(unique_files), BATCH_SIZE)]
+            sem = asyncio.Semaphore(max(1, CONCURRENCY // BATCH_SIZE))
+            batch_results = await asyncio.gather(*(
+                _process_batch(session, sem, api_url, batch, results_dir)
+                for batch in batches
+            ))
+            result_by_path = {
+                image_path: result
+                for batch, results in zip(batches, batch_results)
+                for image_path, result in zip(batch, results)
+            }
+            
+            # Дубликаты получают результат первого изображения с тем же содержимым
+            results = []
+            for image_path in image_files:
+                first_path = first_of[image_path]
+                if first_path == image_path:
+                    results.append(result_by_path[image_path])
+                else:
+                    results.append(dict(result_by_path[first_path],
+                                        image_name=os.path.basename(image_path),
+                                        duplicate_of=os.path.basename(first_path)))
         
         # Сохраняем результаты
-        with open(os.path.join(results_dir, "api_results.json"), "w") as f:
-            json.dump({
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "results": results
-            }, f, indent=2)
+        await _write_file(os.path.join(results_dir, "api_results.json"), _dumps_json({
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "results": results
+        }))
             
         print(f"\nРезультаты API-тестирования сохранены в {os.path.join(results_dir, 'api_results.json')}")
         
@@ -163,15 +327,17 @@ def test_api():
         print(f"Ошибка при тестировании API: {str(e)}")
         return False
     finally:
-        # Останавливаем сервер
+        # Останавливаем сервер: сначала штатно, дожидаясь завершения запросов,
+        # затем принудительно, если он не остановился за SHUTDOWN_TIMEOUT
         print("Остановка API сервера...")
-        try:
-            server_process.terminate()
-            server_process.wait(timeout=5)
-        except:
-            server_process.kill()
+        loop = asyncio.get_running_loop()
+        server.should_exit = True
+        await loop.run_in_executor(None, server_thread.join, SHUTDOWN_TIMEOUT)
+        if server_thread.is_alive():
+            server.force_exit = True
+            await loop.run_in_executor(None, server_thread.join, SHUTDOWN_TIMEOUT)
     
     return True
 
 if __name__ == "__main__":
-    test_api()
+    asyncio.run(test_api())
@@ -4,10 +4,49 @@
 
 import os
 import json
+import matplotlib
+# Графики только сохраняются в файлы, поэтому GUI-бэкенд не нужен
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import numpy as np
 import sys
 
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Поля результатов, по которым строятся графики. Имя изображения - имя файла,
+# поэтому 255 символов достаточно
+RESULT_DTYPE = np.dtype([
+    ("image_name", "U255"),
+    ("base_nodes", "i4"),
+    ("enhanced_nodes", "i4"),
+    ("base_edges", "i4"),
+    ("enhanced_edges", "i4"),
+    ("base_time", "f8"),
+    ("enhanced_time", "f8"),
+    ("cache_speedup", "f8")
+])
+
+# Быстрое сжатие PNG: графики из нескольких столбцов почти не уменьшаются
+# от сильного сжатия, а кодируются с ним в разы дольше
+SAVEFIG_KWARGS = {"pil_kwargs": {"compress_level": 1}}
+
+def _result_rows(f):
+    """Перебирает записи results из открытого файла результатов, пропуская записи с ошибками."""
+    if IJSON_AVAILABLE:
+        # Записи разбираются по одной, файл целиком в память не загружается
+        results = ijson.items(f, "results.item", use_float=True)
+    else:
+        results = json.load(f)["results"]
+    
+    for r in results:
+        if "error" not in r:
+            yield (r["image_name"], r["base_nodes"], r["enhanced_nodes"], r["base_edges"],
+                   r["enhanced_edges"], r["base_time"], r["enhanced_time"], r["cache_speedup"])
+
 def visualize_test_results(results_file="test_results/test_summary.json"):
     """Визуализирует результаты тестирования."""
     
@@ -16,94 +55,99 @@ def visualize_test_results(results_file="test_results/test_summary.json"):
         print(f"Ошибка: Файл с результатами не найден: {results_file}")
         return False
     
-    # Загружаем результаты
-    with open(results_file, "r") as f:
-        test_results = json.load(f)
+    # Загружаем результаты без ошибок за один проход прямо в структурированный
+    # массив: его столбцы передаются в matplotlib напрямую
+    with open(results_file, "rb") as f:
+        data = np.fromiter(_result_rows(f), dtype=RESULT_DTYPE)
     
-    results = test_results["results"]
-    
-    # Отфильтровываем результаты без ошибок
-    valid_results = [r for r in results if "error" not in r]
-    
-    if not valid_results:
+    if len(data) == 0:
         print("Нет валидных результатов для визуализации.")
         return False
     
-    # Получаем данные для графиков
-    image_names = [r["image_name"] for r in valid_results]
-    base_nodes = [r["base_nodes"] for r in valid_results]
-    enhanced_nodes = [r["enhanced_nodes"] for r in valid_results]
-    base_edges = [r["base_edges"] for r in valid_results]
-    enhanced_edges = [r["enhanced_edges"] for r in valid_results]
-    base_times = [r["base_time"] for r in valid_results]
-    enhanced_times = [r["enhanced_time"] for r in valid_results]
-    cache_speedups = [r["cache_speedup"] for r in valid_results]
+    image_names = data["image_name"]
+    base_nodes = data["base_nodes"]
+    enhanced_nodes = data["enhanced_nodes"]
+    base_edges = data["base_edges"]
+    enhanced_edges = data["enhanced_edges"]
+    base_times = data["base_time"]
+    enhanced_times = data["enhanced_time"]
+    cache_speedups = data["cache_speedup"]
+    
+    # Подписи оси X одинаковы для всех графиков
+    tick_labels = [os.path.basename(name) for name in image_names]
     
     # Создаем директорию для графиков
     charts_dir = os.path.join(os.path.dirname(results_file), "charts")
     os.makedirs(charts_dir, exist_ok=True)
     
-    # 1. График сравнения количества узлов
-    plt.figure(figsize=(10, 6))
+    # Все графики рисуются на одной фигуре: между графиками оси очищаются,
+    # и фигура с рендерером не создаются заново
+    fig, ax = plt.subplots(figsize=(10, 6))
     x = np.arange(len(image_names))
     width = 0.35
     
-    plt.bar(x - width/2, base_nodes, width, label='Базовое распознавание')
-    plt.bar(x + width/2, enhanced_nodes, width, label='Улучшенное распознавание')
+    # 1. График сравнения количества узлов
+    ax.bar(x - width/2, base_nodes, width, label='Базовое распознавание')
+    ax.bar(x + width/2, enhanced_nodes, width, label='Улучшенное распознавание')
     
-    plt.xlabel('Изображение')
-    plt.ylabel('Количество узлов')
-    plt.title('Сравнение количества распознанных узлов')
-    plt.xticks(x, [os.path.basename(name) for name in image_names], rotation=45)
-    plt.legend()
-    plt.tight_layout()
+    ax.set_xlabel('Изображение')
+    ax.set_ylabel('Количество узлов')
+    ax.set_title('Сравнение количества распознанных узлов')
+    ax.set_xticks(x)
+    ax.set_xticklabels(tick_labels, rotation=45)
+    ax.legend()
+    fig.tight_layout()
     
-    plt.savefig(os.path.join(charts_dir, "nodes_comparison.png"))
+    fig.savefig(os.path.join(charts_dir, "nodes_comparison.png"), **SAVEFIG_KWARGS)
     
     # 2. График сравнения количества ребер
-    plt.figure(figsize=(10, 6))
+    ax.clear()
     
-    plt.bar(x - width/2, base_edges, width, label='Базовое распознавание')
-    plt.bar(x + width/2, enhanced_edges, width, label='Улучшенное распознавание')
+    ax.bar(x - width/2, base_edges, width, label='Базовое распознавание')
+    ax.bar(x + width/2, enhanced_edges, width, label='Улучшенное распознавание')
     
-    plt.xlabel('Изображение')
-    plt.ylabel('Количество ребер')
-    plt.title('Сравнение количества распознанных ребер')
-    plt.xticks(x, [os.path.basename(name) for name in image_names], rotation=45)
-    plt.legend()
-    plt.tight_layout()
+    ax.set_xlabel('Изображение')
+    ax.set_ylabel('Количество ребер')
+    ax.set_title('Сравнение количества распознанных ребер')
+    ax.set_xticks(x)
+    ax.set_xticklabels(tick_labels, rotation=45)
+    ax.legend()
+    fig.tight_layout()
     
-    plt.savefig(os.path.join(charts_dir, "edges_comparison.png"))
+    fig.savefig(os.path.join(charts_dir, "edges_comparison.png"), **SAVEFIG_KWARGS)
     
     # 3. График сравнения времени обработки
-    plt.figure(figsize=(10, 6))
+    ax.clear()
     
-    plt.bar(x - width/2, base_times, width, label='Базовое распознавание')
-    plt.bar(x + width/2, enhanced_times, width, label='Улучшенное распознавание')
+    ax.bar(x - width/2, base_times, width, label='Базовое распознавание')
+    ax.bar(x + width/2, enhanced_times, width, label='Улучшенное распознавание')
     
-    plt.xlabel('Изображение')
-    plt.ylabel('Время обработки (сек)')
-    plt.title('Сравнение времени обработки')
-    plt.xticks(x, [os.path.basename(name) for name in image_names], rotation=45)
-    plt.legend()
-    plt.tight_layout()
+    ax.set_xlabel('Изображение')
+    ax.set_ylabel('Время обработки (сек)')
+    ax.set_title('Сравнение времени обработки')
+    ax.set_xticks(x)
+    ax.set_xticklabels(tick_labels, rotation=45)
+    ax.legend()
+    fig.tight_layout()
     
-    plt.savefig(os.path.join(charts_dir, "time_comparison.png"))
+    fig.savefig(os.path.join(charts_dir, "time_comparison.png"), **SAVEFIG_KWARGS)
     
     # 4. График ускорения с кэшированием
-    plt.figure(figsize=(10, 6))
+    ax.clear()
     
-    plt.bar(x, cache_speedups, width)
+    ax.bar(x, cache_speedups, width)
     
-    plt.xlabel('Изображение')
-    plt.ylabel('Ускорение (раз)')
-    plt.title('Ускорение за счет кэширования')
-    plt.xticks(x, [os.path.basename(name) for name in image_names], rotation=45)
-    plt.axhline(y=1.0, color='r', linestyle='--', label='Без ускорения')
-    plt.legend()
-    plt.tight_layout()
+    ax.set_xlabel('Изображение')
+    ax.set_ylabel('Ускорение (раз)')
+    ax.set_title('Ускорение за счет кэширования')
+    ax.set_xticks(x)
+    ax.set_xticklabels(tick_labels, rotation=45)
+    ax.axhline(y=1.0, color='r', linestyle='--', label='Без ускорения')
+    ax.legend()
+    fig.tight_layout()
     
-    plt.savefig(os.path.join(charts_dir, "cache_speedup.png"))
+    fig.savefig(os.path.join(charts_dir, "cache_speedup.png"), **SAVEFIG_KWARGS)
+    plt.close(fig)
     
     print(f"Графики результатов сохранены в директорию: {charts_dir}")
     return True